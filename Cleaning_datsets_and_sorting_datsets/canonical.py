@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+import gazetteer
+from categorical import map_unique
+
+# ==========================================
+# FUZZY STATE / DISTRICT CANONICALIZATION
+# ==========================================
+# The hand-written correction dicts only know a handful of spellings.
+# Canonical names are indexed by character trigrams (districts: one index
+# per state, so "Raigad" can never become another state's "Raigarh"); an
+# unseen spelling is matched against the few names sharing most trigrams
+# with it and accepted only if the edit distance is small and the best
+# match is unambiguous.  Every distinct raw spelling is resolved once and
+# memoized in a JSON cache, so the fuzzy part never scales with row count.
+# Districts are only matched against a gazetteer's districts: a state with
+# no known districts keeps its district spellings as they are.
+
+CANONICAL_CACHE_NAME = "canonical_cache.json"
+CACHE_VERSION = 2        # 2: no district matching without a gazetteer
+
+# 28 states + 8 union territories, in the cleaners' title-case form
+INDIAN_STATES = (
+    "Andaman And Nicobar Islands", "Andhra Pradesh", "Arunachal Pradesh", "Assam",
+    "Bihar", "Chandigarh", "Chhattisgarh", "Dadra And Nagar Haveli And Daman And Diu",
+    "Delhi", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jammu And Kashmir",
+    "Jharkhand", "Karnataka", "Kerala", "Ladakh", "Lakshadweep", "Madhya Pradesh",
+    "Maharashtra", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Odisha",
+    "Puducherry", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana",
+    "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal",
+)
+
+# Placeholders written by the cleaners / sorters are never "corrected"
+PLACEHOLDERS = ("INVALID", "Unknown")
+
+MIN_SIMILARITY = 0.8     # 1 - edit_distance / max(len)
+MAX_CANDIDATES = 8       # names (by shared trigrams) that get an exact distance
+MIN_MARGIN = 0.05        # best must beat the runner-up by this much
+
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def name_key(name):
+    # "Jammu & Kashmir" / "jammu and  kashmir" / "JammuAndKashmir" → "jammuandkashmir"
+    return NON_ALNUM.sub("", name.lower().replace("&", "and"))
+
+
+def _trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class NameIndex:
+    # Trigram inverted index over one set of canonical names
+
+    def __init__(self, names):
+        self.exact = {}
+        self.keys = []
+        self.grams = defaultdict(list)
+        for name in sorted(set(names)):
+            key = name_key(name)
+            if not key or key in self.exact:
+                continue
+            self.exact[key] = name
+            for gram in _trigrams(key):
+                self.grams[gram].append(len(self.keys))
+            self.keys.append(key)
+
+    def lookup(self, raw):
+        # Canonical name for raw, or None when nothing is close enough
+        key = name_key(raw)
+        if not key:
+            return None
+        if key in self.exact:
+            return self.exact[key]
+
+        shared = Counter()
+        for gram in _trigrams(key):
+            shared.update(self.grams.get(gram, ()))
+        scored = []
+        for idx, _ in shared.most_common(MAX_CANDIDATES):
+            other = self.keys[idx]
+            scored.append((1 - edit_distance(key, other) / max(len(key), len(other)), other))
+        if not scored:
+            return None
+
+        scored.sort(reverse=True)
+        best_score, best_key = scored[0]
+        if best_score < MIN_SIMILARITY:
+            return None
+        if len(scored) > 1 and best_score - scored[1][0] < MIN_MARGIN:
+            return None    # ambiguous (e.g. East / West Godavari): leave as is
+        return self.exact[best_key]
+
+
+class Canonicalizer:
+
+    def __init__(self, states=INDIAN_STATES, districts_by_state=None, extra_districts=()):
+        # districts_by_state: {state: [district, ...]} (e.g. from the gazetteer);
+        # extra_districts are allowed in every one of those states (alias targets)
+        districts_by_state = districts_by_state or {}
+        self.states = NameIndex(states)
+        self.district_names = {
+            state: sorted(set(names) | set(extra_districts))
+            for state, names in districts_by_state.items()
+        }
+        self.extra_districts = sorted(set(extra_districts))
+        self._district_indexes = {}
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [CACHE_VERSION, sorted(set(states)), self.district_names, self.extra_districts], sort_keys=True
+        ).encode("utf-8")).hexdigest()
+        self.cache = {"state": {}, "district": {}}
+        self.resolved = 0
+
+    @classmethod
+    def from_gazetteer(cls, gaz, extra_states=(), extra_districts=()):
+        return cls(
+            states=tuple(INDIAN_STATES) + tuple(extra_states),
+            districts_by_state=gaz.districts_by_state(),
+            extra_districts=extra_districts,
+        )
+
+    @property
+    def matches_districts(self):
+        return bool(self.district_names)
+
+    def _district_index(self, state):
+        # None when there is no district vocabulary for the state
+        if state not in self._district_indexes:
+            names = self.district_names.get(state)
+            self._district_indexes[state] = NameIndex(names) if names else None
+        return self._district_indexes[state]
+
+    # ---------------- RESOLUTION (memoized) ----------------
+
+    def canonical_state(self, raw):
+        if raw is None or raw in PLACEHOLDERS:
+            return raw
+        cache = self.cache["state"]
+        if raw not in cache:
+            cache[raw] = self.states.lookup(raw)
+            self.resolved += 1
+        return cache[raw] or raw
+
+    def canonical_district(self, state, raw):
+        if raw is None or raw in PLACEHOLDERS:
+            return raw
+        cache_key = f"{state}\t{raw}"
+        cache = self.cache["district"]
+        if cache_key not in cache:
+            index = self._district_index(state)
+            cache[cache_key] = index.lookup(raw) if index is not None else None
+            self.resolved += 1
+        return cache[cache_key] or raw
+
+    # ---------------- COLUMN API ----------------
+
+    def map_states(self, values):
+        # Categorical Series → categorical Series, one lookup per distinct value
+        return map_unique(values, lambda v: v.map(self.canonical_state, na_action="ignore"))
+
+    def map_districts(self, states, districts):
+        # One lookup per distinct (state, district) pair
+        s_codes, s_uniques = pd.factorize(states)
+        d_codes, d_uniques = pd.factorize(districts)
+        combined = (s_codes.astype(np.int64) + 1) * (len(d_uniques) + 1) + (d_codes + 1)
+        pair_codes, pairs = pd.factorize(combined)
+
+        s_uniques = np.asarray(s_uniques, dtype=object)
+        d_uniques = np.asarray(d_uniques, dtype=object)
+        resolved = []
+        for pair in pairs:
+            s, d = divmod(int(pair), len(d_uniques) + 1)
+            state = s_uniques[s - 1] if s else None
+            district = d_uniques[d - 1] if d else None
+            resolved.append(self.canonical_district(state, district))
+
+        cleaned_codes, categories = pd.factorize(pd.Series(resolved, dtype="string"), sort=True)
+        final = pd.Categorical.from_codes(
+            cleaned_codes[pair_codes].astype(np.int32),
+            categories=pd.Index(categories, dtype="string"),
+        )
+        return pd.Series(final, index=districts.index, name=districts.name)
+
+    # ---------------- PERSISTENCE ----------------
+
+    def load_cache(self, path):
+        if not path or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        # Resolutions are only valid for the canonical names they were made against
+        if saved.get("fingerprint") != self.fingerprint:
+            return 0
+        self.cache = {"state": saved.get("state", {}), "district": saved.get("district", {})}
+        return len(self.cache["state"]) + len(self.cache["district"])
+
+    def save_cache(self, path):
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, **self.cache}, f,
+                      ensure_ascii=False, sort_keys=True, indent=1)
+        os.replace(tmp_path, path)
+
+    def corrections(self):
+        # raw → canonical for every spelling that was actually changed
+        changed = {raw: name for raw, name in self.cache["state"].items() if name and name != raw}
+        for key, name in self.cache["district"].items():
+            raw = key.split("\t", 1)[1]
+            if name and name != raw:
+                changed[key] = name
+        return changed
+
+
+def load_default(base_dir, gazetteer_path=None, extra_states=(), extra_districts=()):
+    # Canonical districts come from the gazetteer when one has been built
+    gazetteer_path = gazetteer_path or os.path.join(base_dir, gazetteer.GAZETTEER_NAME)
+    if os.path.exists(gazetteer_path):
+        canon = Canonicalizer.from_gazetteer(gazetteer.get(gazetteer_path),
+                                             extra_states, extra_districts)
+    else:
+        print(f"⚠️  No gazetteer at {gazetteer_path}: fuzzy matching of states only")
+        canon = Canonicalizer(tuple(INDIAN_STATES) + tuple(extra_states),
+                              extra_districts=extra_districts)
+    cache_path = os.path.join(base_dir, CANONICAL_CACHE_NAME)
+    known = canon.load_cache(cache_path)
+    return canon, cache_path, known
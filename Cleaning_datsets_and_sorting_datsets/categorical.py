@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# DICTIONARY-ENCODED VALUE MAPPING
+# ==========================================
+# State / district / gender have a few dozen to a few hundred distinct
+# values per chunk.  map_unique() factorizes the column, runs the cleaning
+# function once per distinct value and broadcasts the results back
+# through the integer codes.  Distinct raw spellings that clean to the
+# same value (" pune", "Pune") collapse into one category.  Numeric
+# results (counts) are broadcast as they are.
+
+
+def _rebuild(codes, cleaned, index, name, as_category):
+    # Re-factorize: several raw spellings may now map to one cleaned value.
+    # Sorted categories make code order equal string order, so sorting a
+    # categorical column gives the same result as sorting the strings.
+    cleaned = pd.Series(np.asarray(cleaned, dtype=object), dtype="string")
+    cleaned_codes, categories = pd.factorize(cleaned, sort=True)
+
+    final_codes = np.full(len(codes), -1, dtype=np.int32)
+    valid = codes >= 0
+    final_codes[valid] = cleaned_codes[codes[valid]]
+
+    result = pd.Categorical.from_codes(final_codes, categories=pd.Index(categories, dtype="string"))
+    result = pd.Series(result, index=index, name=name)
+    return result if as_category else result.astype("string")
+
+
+def map_unique(values, func, as_category=True):
+    # func: string Series of distinct values → Series of cleaned values (same length)
+    codes, uniques = pd.factorize(values)
+    cleaned = func(pd.Series(np.asarray(uniques, dtype=object), dtype="string"))
+    return _rebuild(codes, cleaned, values.index, values.name, as_category)
+
+
+def map_unique_flagged(values, func, as_category=True):
+    # Like map_unique for funcs returning (cleaned, flags), where flags holds
+    # one label (or None) per distinct value.  Returns the cleaned Series and
+    # the flags broadcast to rows (object array, None = not flagged).
+    codes, uniques = pd.factorize(values)
+    cleaned, flags = func(pd.Series(np.asarray(uniques, dtype=object), dtype="string"))
+
+    row_flags = np.full(len(codes), None, dtype=object)
+    valid = codes >= 0
+    row_flags[valid] = np.asarray(flags, dtype=object)[codes[valid]]
+    if pd.api.types.is_numeric_dtype(cleaned):
+        numbers = pd.array(cleaned).take(codes, allow_fill=True)
+        return pd.Series(numbers, index=values.index, name=values.name), row_flags
+    return _rebuild(codes, cleaned, values.index, values.name, as_category), row_flags
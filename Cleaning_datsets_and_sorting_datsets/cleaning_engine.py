@@ -0,0 +1,518 @@
+import argparse
+import contextlib
+import itertools
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+import date_cache
+import gazetteer
+import ingest
+import manifest
+import memory_budget
+import profiler
+import schema
+from categorical import map_unique_flagged
+from dedup import DEFAULT_MEMORY_MB, RowDeduplicator, hash_rows
+from parallel_chunks import ordered_map
+from quality import QualitySink, add_reasons
+from storage import FORMATS, TableWriter, format_of, with_format
+
+# ==========================================
+# SHARED CLEANING ENGINE
+# ==========================================
+# Each dataset is described by a rule spec: (column, step, *args) tuples
+# applied in order.  compile_plan() resolves the spec against the CSV
+# header once, drops rules for absent columns and fuses all steps of a
+# column into one pipeline, so every dataset runs through the same code
+# path below.  All steps are value-wise, so each pipeline runs once per
+# distinct value of the column (see categorical.map_unique) rather than
+# once per row.
+
+CHUNK_SIZE = 200_000
+
+DATE_CACHE_NAME = "date_cache.json"
+
+# Low-cardinality columns stay dictionary-encoded all the way to the writer
+CATEGORICAL_COLUMNS = ("state", "district", "gender")
+
+BIOMETRIC_SPEC = {
+    "name": "biometric",
+    "rules": [
+        ("state", "strip_title"),
+        ("state", "min_length", 3, "INVALID"),
+        ("district", "strip_title"),
+        ("date", "date"),
+        ("pincode", "pincode_pad"),
+        ("bio_age_5_17", "count"),
+        ("bio_age_17_", "count"),
+    ],
+}
+
+DEMOGRAPHIC_SPEC = {
+    "name": "demographic",
+    "rules": [
+        ("state", "strip_title"),
+        ("district", "strip_title"),
+        ("state", "min_length", 3, "INVALID"),
+        ("date", "date"),
+        ("pincode", "pincode_strict"),
+        ("demo_age_5_17", "count"),
+        ("demo_age_17_", "count"),
+    ],
+}
+
+ENROLMENT_SPEC = {
+    "name": "enrolment",
+    "rules": [
+        ("state", "strip_title"),
+        ("district", "strip_title"),
+        ("enrolment_date", "date"),
+        ("date", "date"),
+        ("pincode", "pincode_strict"),
+        ("gender", "upper_map", {"M": "Male", "F": "Female"}),
+        ("age_0_5", "count"),
+        ("age_5_17", "count"),
+        ("age_18_greater", "count"),
+    ],
+}
+
+DATASET_SPECS = {
+    spec["name"]: spec for spec in (BIOMETRIC_SPEC, DEMOGRAPHIC_SPEC, ENROLMENT_SPEC)
+}
+
+# ==========================================
+# STEPS (string Series in → Series out)
+# ==========================================
+PINCODE_STRICT = re.compile(r"(\d{6})")
+PINCODE_DIGITS = re.compile(r"(\d+)")
+
+
+def step_strip_title(values):
+    return values.str.strip().str.title()
+
+
+def step_min_length(values, min_len, replacement):
+    # Missing values stay missing (NA comparison → False, as with .loc)
+    return values.mask((values.str.len() < min_len).fillna(False), replacement)
+
+
+def step_date(values):
+    return date_cache.normalize_dates(values)
+
+
+def step_pincode_strict(values):
+    return values.str.extract(PINCODE_STRICT, expand=False)
+
+
+def step_pincode_pad(values):
+    return values.str.extract(PINCODE_DIGITS, expand=False).str.zfill(6)
+
+
+def step_upper_map(values, mapping):
+    return values.str.upper().replace(mapping)
+
+
+def step_count(values):
+    # Whole, non-negative numbers that fit the int32 schema; anything else → missing
+    numbers = pd.to_numeric(values.str.strip(), errors="coerce").astype("Float64")
+    whole = ((numbers % 1 == 0) & (numbers >= 0) & (numbers < 2 ** 31)).fillna(False)
+    return numbers.where(whole).astype(schema.COUNT_DTYPE)
+
+
+STEPS = {
+    "strip_title": step_strip_title,
+    "min_length": step_min_length,
+    "date": step_date,
+    "pincode_strict": step_pincode_strict,
+    "pincode_pad": step_pincode_pad,
+    "upper_map": step_upper_map,
+    "count": step_count,
+}
+
+
+# Steps that reject or repair values → reason code suffix, and how a hit is
+# detected: "to_na" = a present value became missing, "changed" = replaced
+STEP_REASONS = {
+    "min_length": ("too_short", "changed"),
+    "date": ("unparseable", "to_na"),
+    "pincode_strict": ("invalid", "to_na"),
+    "pincode_pad": ("invalid", "to_na"),
+    "count": ("invalid", "to_na"),
+}
+
+GEO_REASONS = {
+    gazetteer.GEO_FILLED: "geo_filled",
+    gazetteer.GEO_MISMATCH: "geo_state_mismatch",
+    gazetteer.GEO_DISTRICT_MISMATCH: "geo_district_mismatch",
+}
+
+
+def run_steps(values, steps, column=None, prof=profiler.NULL, rows=None):
+    # Returns the cleaned values and one reason code (or None) per value:
+    # the first rejecting / repairing step wins.  rows: chunk rows the
+    # (distinct) values stand for, for the profiler
+    flags = np.full(len(values), None, dtype=object)
+    for step, args in steps:
+        before = values
+        with prof.stage(f"{column}.{step}", rows or len(values), len(values)):
+            values = STEPS[step](values, *args)
+        if step in STEP_REASONS:
+            reason, kind = STEP_REASONS[step]
+            if kind == "to_na":
+                hit = before.notna() & values.isna()
+            else:
+                hit = before.notna() & (values != before).fillna(False)
+            hit = hit.to_numpy(dtype=bool) & pd.isna(flags)
+            flags[hit] = f"{column}_{reason}"
+    return values, flags
+
+# ==========================================
+# PLAN
+# ==========================================
+
+
+class CleaningPlan:
+
+    def __init__(self, name, column_steps, gazetteer_path=None, profile=None):
+        # column_steps: [(column, [(step_name, args), ...]), ...]
+        self.name = name
+        self.column_steps = column_steps
+        # Only the path travels to pool workers; each loads the index once
+        self.gazetteer_path = gazetteer_path
+        # None, or {"trace_alloc": bool}: profile each call (see profiler.py)
+        self.profile = profile
+
+    def describe(self):
+        lines = [
+            f"{col}: " + " → ".join(step for step, _ in steps)
+            for col, steps in self.column_steps
+        ]
+        if self.gazetteer_path:
+            lines.append(f"state/district: pincode gazetteer ({os.path.basename(self.gazetteer_path)})")
+        return lines
+
+    def __call__(self, chunk):
+        prof = profiler.Profiler(**self.profile) if self.profile else profiler.NULL
+
+        # 1. Drop duplicates WITHIN chunk, hash the rest for the global pass
+        rows_in = len(chunk)
+        with prof.stage("drop_duplicates", rows_in):
+            chunk = chunk.drop_duplicates()
+        rows = len(chunk)
+        with prof.stage("hash_rows", rows):
+            row_hashes = hash_rows(chunk)
+        raw = chunk.copy(deep=False)     # pre-cleaning values for the quarantine
+        reasons = np.full(len(chunk), None, dtype=object)
+
+        # 2. One fused pipeline per column, evaluated on its distinct values
+        for col, steps in self.column_steps:
+            with prof.stage(col, rows):
+                chunk[col], flags = map_unique_flagged(
+                    chunk[col],
+                    lambda values, steps=steps, col=col: run_steps(values, steps, col, prof, rows),
+                    as_category=col in CATEGORICAL_COLUMNS,
+                )
+                add_reasons(reasons, flags)
+
+        # 3. Cross-column check: fill / flag state and district from the pincode
+        if self.gazetteer_path:
+            with prof.stage("gazetteer", rows):
+                chunk = gazetteer.repair(chunk, gazetteer.get(self.gazetteer_path))
+                geo = chunk["geo_check"].astype(object).map(GEO_REASONS).to_numpy(dtype=object)
+                add_reasons(reasons, geo)
+
+        # Dates learned in a worker are shipped back so the writer can persist them
+        return {
+            "chunk": chunk,
+            "row_hashes": row_hashes,
+            "new_dates": date_cache.drain_new_entries(),
+            "rows_in": rows_in,
+            "reasons": reasons,
+            "flagged_raw": raw[pd.notna(reasons)],
+            "profile": prof.drain(),
+        }
+
+
+def compile_plan(spec, columns, gazetteer_path=None, profile=None):
+    present = set(columns)
+    column_steps = {}
+    for col, step, *args in spec["rules"]:
+        if step not in STEPS:
+            raise ValueError(f"Unknown cleaning step '{step}' in {spec['name']} spec")
+        if col in present:
+            column_steps.setdefault(col, []).append((step, tuple(args)))
+
+    # Keep the file's column order so output layout is unchanged
+    ordered = [(col, column_steps[col]) for col in columns if col in column_steps]
+
+    if gazetteer_path and not present.issuperset(gazetteer.REQUIRED_COLUMNS):
+        raise ValueError(f"--gazetteer needs columns {gazetteer.REQUIRED_COLUMNS} in the input")
+    return CleaningPlan(spec["name"], ordered, gazetteer_path=gazetteer_path, profile=profile)
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+
+def _counted(chunks, counter):
+    for chunk in chunks:
+        counter["rows_in"] += len(chunk)
+        yield chunk
+
+
+def run_cleaning(spec, input_file, output_file, workers=1, max_in_flight=None,
+                 dedup_memory_mb=None, chunk_size=CHUNK_SIZE,
+                 date_cache_file=None, output_format="csv",
+                 incremental=False, verify="full", readers=ingest.DEFAULT_READERS,
+                 gazetteer_path=None, quarantine=True, max_memory=None, profile=False,
+                 profile_alloc=False, tee=None):
+    # max_memory: budget in bytes; chunk size (and up to `workers` worker
+    # processes) are then derived from the first chunk
+    # profile: time every stage and rule per chunk (see profiler.py);
+    # profile_alloc also traces allocations (implies profile)
+    # tee: gets every written chunk as it reads back (see TableWriter), e.g.
+    # the sorter in pipeline.py
+    started = time.perf_counter()
+    # input_file: one CSV, or a directory / glob of raw part files
+    multi_file = ingest.is_multi_source(input_file)
+    if multi_file:
+        paths = ingest.expand_inputs(input_file)
+        header = ingest.check_headers(paths)
+    else:
+        if not os.path.isfile(input_file):
+            raise FileNotFoundError(f"Input file not found: {input_file}")
+        header = pd.read_csv(input_file, nrows=0).columns.tolist()
+
+    output_file = with_format(output_file, output_format)
+    if gazetteer_path:
+        if not os.path.isfile(gazetteer_path):
+            raise FileNotFoundError(f"Gazetteer not found: {gazetteer_path} (build it with gazetteer.py)")
+        gazetteer_path = os.path.abspath(gazetteer_path)
+    profile = {"trace_alloc": profile_alloc} if profile or profile_alloc else None
+    plan = compile_plan(spec, header, gazetteer_path=gazetteer_path, profile=profile)
+    extra = {"gazetteer": manifest.file_sha256(gazetteer_path)} if gazetteer_path else None
+    fingerprint = manifest.config_fingerprint(spec, output_format, extra)
+
+    # Warm the date cache before the pool forks so workers inherit it
+    if date_cache_file is None:
+        date_cache_file = os.path.join(os.path.dirname(os.path.abspath(output_file)), DATE_CACHE_NAME)
+    cached_dates = date_cache.load_cache(date_cache_file)
+
+    print(f"Starting {spec['name']} cleaning...")
+    if multi_file:
+        print(f"  input: {len(paths)} part files ({readers} concurrent readers)")
+    print(f"  date cache: {cached_dates} known values")
+    for line in plan.describe():
+        print(f"  {line}")
+
+    # A memory budget sizes the dedup set too, unless given explicitly
+    if dedup_memory_mb is None:
+        dedup_memory_mb = (max_memory * memory_budget.DEDUP_SHARE / (1 << 20)
+                           if max_memory else DEFAULT_MEMORY_MB)
+    sizer = None
+    if max_memory:
+        memory_budget.check_budget(max_memory, int(dedup_memory_mb * (1 << 20)))
+        sizer = memory_budget.ChunkSizer(min(memory_budget.SAMPLE_ROWS, chunk_size))
+        chunk_size = sizer
+
+    dedup = RowDeduplicator(memory_mb=dedup_memory_mb,
+                            spill_dir=os.path.dirname(os.path.abspath(output_file)))
+    previous = manifest.load_manifest(output_file)
+
+    # ---------------- INPUT SELECTION ----------------
+    resume = False
+    if multi_file:
+        todo = paths
+        if incremental:
+            resume, reason, todo = manifest.check_resume_parts(
+                previous, paths, output_file, header, fingerprint, verify=verify)
+            print(f"  incremental: {reason}" + ("" if resume else " → full rebuild"))
+    else:
+        # Snapshot the input: bytes appended while we run belong to the next run
+        size = os.path.getsize(input_file)
+        end = manifest.complete_lines_end(input_file, size)
+        ends_mid_line = end < size
+        if ends_mid_line:
+            end = size
+        if incremental:
+            resume, reason = manifest.check_resume(previous, input_file, output_file,
+                                                   header, fingerprint, verify=verify)
+            print(f"  incremental: {reason}" + ("" if resume else " → full rebuild"))
+
+    if resume:
+        total_rows = previous["rows_out"]
+        dedup.load_state(manifest.dedup_state_path(output_file))
+        nothing_new = not todo if multi_file else previous["offset"] == end
+        if nothing_new:
+            print("✅ Nothing new to clean")
+            return total_rows
+        if format_of(output_file) == "parquet":
+            print("  note: only new rows are cleaned, but the Parquet file is rewritten to append them")
+    else:
+        previous = None
+        total_rows = 0
+        # Remove old output if exists
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+    rows_per_part = {}
+    counter = {"rows_in": 0}
+    if multi_file:
+        source = contextlib.nullcontext()
+        reader = ingest.iter_parts(todo, header, chunk_size, readers=readers,
+                                   rows_per_part=rows_per_part, dataset=spec["name"])
+    else:
+        start = previous["offset"] if resume else 0
+        source = manifest.open_range(input_file, start, end)
+        # Resumed reads start mid-file, without a header line
+        reader = schema.iter_csv(source, spec["name"], chunk_size, raw=True,
+                                 names=header if start else None)
+        reader = _counted(reader, counter)
+    run_profile = profiler.Profiler(**profile) if profile else profiler.NULL
+    if profile:
+        reader = profiler.timed_chunks(reader, run_profile)
+
+    # Sample: clean the (small) first chunk here, then size the rest of the
+    # run from its measured footprint before the pool starts
+    first = []
+    if sizer is not None:
+        sample = next(reader, None)
+        if sample is not None:
+            first.append(plan(sample))
+            sizing = memory_budget.plan_cleaning(
+                max_memory, len(sample), memory_budget.frame_bytes(sample),
+                memory_budget.frame_bytes(first[0]["chunk"]), workers,
+                reader_chunks=readers * ingest.QUEUE_CHUNKS if multi_file else 0,
+                reserved_bytes=int(dedup_memory_mb * (1 << 20)),
+            )
+            sizer.rows = sizing["chunk_rows"]
+            workers = sizing["workers"]
+            max_in_flight = max_in_flight or sizing["max_in_flight"]
+            print(f"  memory budget {memory_budget.format_size(max_memory)}: "
+                  f"~{sizing['bytes_per_row']} bytes/row → {sizer.rows:,} rows/chunk, "
+                  f"{workers} worker(s)")
+
+    chunk_no = 0
+    cleaned = itertools.chain(
+        first, ordered_map(plan, reader, workers=workers, max_in_flight=max_in_flight))
+
+    quality = QualitySink(output_file, spec["name"], append=resume, quarantine=quarantine)
+
+    # ---------------- CLEAN & WRITE ----------------
+    # Single writer: chunks arrive in input order, so output matches a serial run
+    with source, TableWriter(output_file, append=resume, tee=tee) as writer:
+        for result in cleaned:
+            chunk_no += 1
+            print(f"Processing chunk {chunk_no}...")
+            date_cache.merge_entries(result["new_dates"])
+            if profile:
+                run_profile.add(result["profile"], chunk_no)
+            rows = len(result["chunk"])
+
+            # Drop rows already written by an earlier chunk (or run)
+            with run_profile.stage("dedup", rows, chunk=chunk_no):
+                keep = dedup.keep_mask(result["row_hashes"], first_row=total_rows)
+            with run_profile.stage("quality", rows, chunk=chunk_no):
+                quality.add(result, keep, first_row=total_rows)
+            chunk = result["chunk"][keep]
+
+            with run_profile.stage("write", len(chunk), chunk=chunk_no):
+                writer.write(chunk)
+            total_rows += len(chunk)
+
+    # Resolve duplicates that landed in spilled hash partitions (if any)
+    with run_profile.stage("dedup_finalize", total_rows):
+        late_rows, late_frame = dedup.finalize(output_file)
+    total_rows -= len(late_rows)
+    report = quality.finish(late_rows, late_frame)
+    date_cache.save_cache(date_cache_file)
+
+    # Record progress for the next --incremental run
+    state_saved = dedup.save_state(manifest.dedup_state_path(output_file))
+    if multi_file:
+        new_parts = [manifest.part_record(p, rows_in=rows_per_part.get(p, 0)) for p in todo]
+        record = manifest.build_parts_manifest(previous, spec["name"], header, fingerprint,
+                                               new_parts, total_rows)
+    else:
+        record = manifest.build_manifest(previous, spec["name"], input_file, header, fingerprint,
+                                         start, end, ends_mid_line, counter["rows_in"], total_rows)
+    manifest.save_manifest(output_file, record)
+    if not state_saved:
+        print("  note: dedup set spilled to disk; next incremental run will rebuild")
+
+    print(f"✅ {spec['name'].title()} cleaning finished")
+    print(f"Total rows written: {total_rows:,}")
+    print(f"Quarantined rows: {report['totals']['quarantined_rows']:,}")
+    print(f"Saved as: {output_file}")
+    print(f"Quality report: {quality.report_file}")
+
+    if profile:
+        summary, table_path, _ = profiler.write_report(
+            run_profile.records, output_file, time.perf_counter() - started,
+            {"dataset": spec["name"], "chunks": chunk_no, "workers": workers,
+             "rows_out": total_rows, "output_format": output_format,
+             "trace_alloc": profile_alloc},
+        )
+        profiler.print_summary(summary)
+        print(f"Profile: {table_path}")
+    return total_rows
+
+
+def build_parser(spec, input_file):
+    parser = argparse.ArgumentParser(description=f"Chunk-wise cleaning of {spec['name']}_all.csv")
+    parser.add_argument("--input", default=input_file,
+                        help="merged CSV, or a directory / glob of raw part files (default: %(default)s)")
+    parser.add_argument("--readers", type=int, default=ingest.DEFAULT_READERS,
+                        help="part files parsed concurrently when --input is a directory / glob")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for cleaning (1 = serial)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="max chunks queued ahead of the writer (default: 2 x workers)")
+    parser.add_argument("--dedup-memory-mb", type=int, default=None,
+                        help=f"memory for seen-row hashes before spilling to disk "
+                             f"(default: {DEFAULT_MEMORY_MB}, or 1/4 of --max-memory)")
+    parser.add_argument("--max-memory", type=memory_budget.parse_size, default=None,
+                        help="memory budget, e.g. 4G: chunk size and worker count (at most "
+                             "--workers) are derived from a sample of the first chunk")
+    parser.add_argument("--output-format", choices=FORMATS, default="csv",
+                        help="csv (export) or parquet (columnar, read by all later stages)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="clean only rows appended since the last run (falls back to a full rebuild); "
+                             "Parquet output is still rewritten as a whole to append them")
+    parser.add_argument("--verify", choices=("full", "quick"), default="full",
+                        help="incremental check: re-hash all processed bytes, or only the last 1 MiB")
+    parser.add_argument("--gazetteer", default=None,
+                        help="pincode gazetteer (.npz from gazetteer.py): fill missing state/district "
+                             "and add a geo_check column")
+    parser.add_argument("--no-quarantine", action="store_true",
+                        help="skip the quarantine file of rejected / repaired rows (report is still written)")
+    parser.add_argument("--profile", action="store_true",
+                        help="record wall time, rows/sec and RSS per rule and chunk "
+                             "(<output>.profile.csv / .profile.json)")
+    parser.add_argument("--profile-alloc", action="store_true",
+                        help="--profile plus peak allocated bytes per stage via tracemalloc "
+                             "(much slower; compare memory, not times)")
+    return parser
+
+
+def run_cli(spec, input_file, output_file):
+    args = build_parser(spec, input_file).parse_args()
+    return run_cleaning(
+        spec, args.input, output_file,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        dedup_memory_mb=args.dedup_memory_mb,
+        output_format=args.output_format,
+        incremental=args.incremental,
+        verify=args.verify,
+        readers=args.readers,
+        gazetteer_path=args.gazetteer,
+        quarantine=not args.no_quarantine,
+        max_memory=args.max_memory,
+        profile=args.profile,
+        profile_alloc=args.profile_alloc,
+    )
@@ -0,0 +1,120 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# UNIQUE-VALUE DATE CACHE
+# ==========================================
+# The datasets span a few hundred distinct dates over tens of millions of
+# rows, so dates are factorized and only the distinct raw strings that
+# were never seen before are parsed.  The raw → "YYYY-MM-DD" map is
+# process-wide (it survives across chunks and, in the process pool, across
+# tasks handled by the same worker) and can be saved to / loaded from a
+# small JSON file so the next run starts warm.
+#
+# Every distinct value is parsed on its own: first against DATE_FORMATS,
+# then by pandas' parser (dayfirst, unless the text starts with a year),
+# so the result never depends on which other values share its batch.
+# Unparseable values are remembered for the run but never saved, so a
+# later run gets to try them again.
+
+ISO_FORMAT = "%Y-%m-%d"
+DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%y", "%d/%m/%y",
+                "%Y-%m-%d %H:%M:%S", "%d-%m-%Y %H:%M:%S")
+YEAR_FIRST = re.compile(r"\d{4}\D")
+
+_cache = {}          # raw string → "YYYY-MM-DD" (None = unparseable, this run only)
+_new_entries = {}    # learned since the last drain_new_entries()
+
+
+def _map_codes(codes, mapped_uniques):
+    # Broadcast per-unique results back through the factorized codes
+    out = np.empty(len(codes), dtype=object)
+    valid = codes >= 0
+    out[valid] = mapped_uniques[codes[valid]]
+    out[~valid] = None
+    return out
+
+
+def _parse_one(raw):
+    # One raw date → "YYYY-MM-DD" or None
+    text = str(raw).strip()
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(text, format=fmt, errors="coerce")
+        if not pd.isna(parsed):
+            return parsed.strftime(ISO_FORMAT)
+    # ISO-like text is year-month-day: dayfirst would swap month and day
+    parsed = pd.to_datetime(text, errors="coerce", dayfirst=not YEAR_FIRST.match(text))
+    return None if pd.isna(parsed) else parsed.strftime(ISO_FORMAT)
+
+
+def normalize_dates(values):
+    # Raw dates (dayfirst) → "YYYY-MM-DD" strings, parsing each distinct value once
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+
+    unseen = [raw for raw in uniques if raw not in _cache]
+    for raw in unseen:
+        iso = _cache[raw] = _parse_one(raw)
+        if iso is not None:
+            _new_entries[raw] = iso
+
+    mapped = np.array([_cache[raw] for raw in uniques], dtype=object)
+    return pd.Series(_map_codes(codes, mapped), index=values.index, dtype="string")
+
+
+def parse_iso_dates(values):
+    # Already-standardized "YYYY-MM-DD" strings → datetime64, one parse per
+    # distinct value.  Used by the sorters on cleaned files: no dayfirst
+    # guessing, which would swap day and month on ISO input.
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values    # Parquet input: date32 is already a datetime
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype="string"), format=ISO_FORMAT, errors="coerce")
+    parsed = parsed.to_numpy(dtype="datetime64[ns]")
+
+    out = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[ns]")
+    valid = codes >= 0
+    out[valid] = parsed[codes[valid]]
+    return pd.Series(out, index=values.index)
+
+# ==========================================
+# CACHE PERSISTENCE / WORKER SYNC
+# ==========================================
+
+
+def drain_new_entries():
+    entries = dict(_new_entries)
+    _new_entries.clear()
+    return entries
+
+
+def merge_entries(entries):
+    _cache.update(entries)
+
+
+def load_cache(path):
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        # Failures are never saved; a null entry is parsed again all the same
+        _cache.update({raw: iso for raw, iso in entries.items() if iso is not None})
+    except (OSError, ValueError):
+        # A corrupt cache only costs a re-parse
+        return 0
+    return len(_cache)
+
+
+def save_cache(path):
+    if not path:
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({raw: iso for raw, iso in _cache.items() if iso is not None},
+                  f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
@@ -0,0 +1,236 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from storage import drop_rows
+
+# ==========================================
+# GLOBAL (CROSS-CHUNK) DE-DUPLICATION
+# ==========================================
+# Every raw row is reduced to a 128-bit hash (two independent 64-bit
+# hashes).  Seen hashes live in sorted uint64 NumPy runs -- 16 bytes per
+# unique row, no Python objects -- and are looked up with searchsorted.
+#
+# When the resident set grows past the memory budget, whole hash
+# partitions (top bits of the first hash) are spilled to
+# `part-XXX.bin` files.  Rows that land in a spilled partition are kept
+# tentatively and their (hash, output row) is appended to the partition
+# file; `finalize()` resolves those partitions one at a time and removes
+# the late duplicates from the written output (CSV or Parquet), handing
+# back their row numbers and contents so the quality report and the
+# quarantine can be corrected.  Without spilling, `finalize()` is a no-op.
+
+HASH_KEY_1 = "uidai-dedup-k001"
+HASH_KEY_2 = "uidai-dedup-k002"
+
+DEFAULT_MEMORY_MB = 1024
+PARTITION_BITS = 8
+
+SPILL_DTYPE = np.dtype([("h1", "<u8"), ("h2", "<u8"), ("row", "<i8")])
+KEY_BYTES = 16
+
+
+def hash_rows(frame):
+    # Chunked readers may infer int64 in one chunk and float64 in the next
+    # (e.g. when a count column has a blank), so numbers are hashed as float
+    hashable = frame.copy(deep=False)
+    for col in hashable.columns:
+        if pd.api.types.is_numeric_dtype(hashable[col]) and not pd.api.types.is_bool_dtype(hashable[col]):
+            hashable[col] = hashable[col].astype("float64")
+
+    hashes = np.empty((len(frame), 2), dtype=np.uint64)
+    hashes[:, 0] = pd.util.hash_pandas_object(hashable, index=False, hash_key=HASH_KEY_1).to_numpy()
+    hashes[:, 1] = pd.util.hash_pandas_object(hashable, index=False, hash_key=HASH_KEY_2).to_numpy()
+    return hashes
+
+
+def _sort_pairs(h1, h2):
+    order = np.lexsort((h2, h1))
+    return h1[order], h2[order]
+
+
+def _first_occurrence(h1, h2):
+    # Mask of rows whose (h1, h2) has not appeared earlier in the same arrays
+    order = np.lexsort((h2, h1))          # stable: ties stay in input order
+    s1, s2 = h1[order], h2[order]
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (s1[1:] != s1[:-1]) | (s2[1:] != s2[:-1])
+    mask = np.zeros(len(order), dtype=bool)
+    mask[order[new_group]] = True
+    return mask
+
+
+def _contains(run, q1, q2):
+    r1, r2 = run
+    left = np.searchsorted(r1, q1, side="left")
+    right = np.searchsorted(r1, q1, side="right")
+    found = np.zeros(len(q1), dtype=bool)
+
+    single = (right - left) == 1
+    found[single] = r2[left[single]] == q2[single]
+
+    # h1 collisions are astronomically rare but must not break exactness
+    for i in np.flatnonzero((right - left) > 1):
+        found[i] = np.any(r2[left[i]:right[i]] == q2[i])
+    return found
+
+
+class RowDeduplicator:
+
+    def __init__(self, memory_mb=DEFAULT_MEMORY_MB, spill_dir=None,
+                 partition_bits=PARTITION_BITS):
+        self.budget_bytes = int(memory_mb * 1024 * 1024)
+        self.partition_bits = partition_bits
+        self.spill_parent = spill_dir
+        self.spill_dir = None
+        self.runs = []
+        self.spilled = np.zeros(2 ** partition_bits, dtype=bool)
+        self.deferred_rows = 0
+
+    # ---------------- IN-MEMORY SET ----------------
+
+    def _partition_of(self, h1):
+        return (h1 >> np.uint64(64 - self.partition_bits)).astype(np.intp)
+
+    def _resident_keys(self):
+        return sum(len(r1) for r1, _ in self.runs)
+
+    def _add_run(self, h1, h2):
+        if len(h1) == 0:
+            return
+        self.runs.append(_sort_pairs(h1, h2))
+
+        # Size-tiered merging keeps the number of runs logarithmic
+        while len(self.runs) >= 2 and len(self.runs[-2][0]) <= 2 * len(self.runs[-1][0]):
+            (a1, a2), (b1, b2) = self.runs[-2], self.runs[-1]
+            self.runs[-2:] = [_sort_pairs(np.concatenate((a1, b1)), np.concatenate((a2, b2)))]
+
+    # ---------------- SPILLING ----------------
+
+    def _part_path(self, part):
+        return os.path.join(self.spill_dir, f"part-{part:03d}.bin")
+
+    def _append_spill(self, part, h1, h2, rows):
+        records = np.empty(len(h1), dtype=SPILL_DTYPE)
+        records["h1"], records["h2"], records["row"] = h1, h2, rows
+        with open(self._part_path(part), "ab") as f:
+            records.tofile(f)
+
+    def _spill(self):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="_tmp_dedup_", dir=self.spill_parent)
+
+        all1 = np.concatenate([r1 for r1, _ in self.runs])
+        all2 = np.concatenate([r2 for _, r2 in self.runs])
+        parts = self._partition_of(all1)
+        counts = np.bincount(parts, minlength=len(self.spilled))
+
+        # Evict the biggest partitions until half the budget is free again
+        target = self.budget_bytes // 2
+        resident = len(all1) * KEY_BYTES
+        evict = np.zeros(len(self.spilled), dtype=bool)
+        for part in np.argsort(counts)[::-1]:
+            if resident <= target or counts[part] == 0:
+                break
+            evict[part] = True
+            resident -= counts[part] * KEY_BYTES
+
+        # Already-decided keys go first with row = -1 ("kept earlier")
+        for part in np.flatnonzero(evict):
+            sel = parts == part
+            self._append_spill(part, all1[sel], all2[sel], np.full(sel.sum(), -1, dtype=np.int64))
+
+        self.spilled |= evict
+        keep = ~evict[parts]
+        self.runs = []
+        self._add_run(all1[keep], all2[keep])
+
+    # ---------------- PUBLIC API ----------------
+
+    def keep_mask(self, hashes, first_row=0):
+        # first_row = number of rows already written to the output
+        h1 = np.ascontiguousarray(hashes[:, 0])
+        h2 = np.ascontiguousarray(hashes[:, 1])
+        mask = _first_occurrence(h1, h2)
+
+        deferred = self.spilled[self._partition_of(h1)]
+        check = mask & ~deferred
+        if check.any():
+            idx = np.flatnonzero(check)
+            seen = np.zeros(len(idx), dtype=bool)
+            for run in self.runs:
+                seen |= _contains(run, h1[idx], h2[idx])
+            mask[idx[seen]] = False
+
+        new = mask & ~deferred
+        self._add_run(h1[new], h2[new])
+
+        # Rows in spilled partitions are kept for now and resolved at the end
+        pending = mask & deferred
+        if pending.any():
+            out_rows = first_row + np.cumsum(mask) - 1
+            parts = self._partition_of(h1)
+            for part in np.unique(parts[pending]):
+                sel = pending & (parts == part)
+                self._append_spill(part, h1[sel], h2[sel], out_rows[sel])
+            self.deferred_rows += int(pending.sum())
+
+        if self._resident_keys() * KEY_BYTES > self.budget_bytes:
+            self._spill()
+
+        return mask
+
+    def save_state(self, path):
+        # Persist the seen-hash set for the next incremental run.  Only
+        # possible while everything is resident; returns False otherwise.
+        if self.spilled.any():
+            if os.path.exists(path):
+                os.remove(path)
+            return False
+        h1 = np.concatenate([r1 for r1, _ in self.runs]) if self.runs else np.empty(0, np.uint64)
+        h2 = np.concatenate([r2 for _, r2 in self.runs]) if self.runs else np.empty(0, np.uint64)
+        h1, h2 = _sort_pairs(h1, h2)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, h1=h1, h2=h2)
+        os.replace(path + ".tmp", path)
+        return True
+
+    def load_state(self, path):
+        with np.load(path) as state:
+            self.runs = [(state["h1"], state["h2"])] if len(state["h1"]) else []
+        if self._resident_keys() * KEY_BYTES > self.budget_bytes:
+            self._spill()
+
+    def finalize(self, output_file):
+        # Returns (sorted output rows removed as late duplicates, the removed
+        # rows as a frame or None when nothing was removed)
+        if self.spill_dir is None:
+            return np.empty(0, dtype=np.int64), None
+
+        drop = []
+        removed = None
+        try:
+            if self.deferred_rows:
+                for part in np.flatnonzero(self.spilled):
+                    path = self._part_path(part)
+                    if not os.path.exists(path):
+                        continue
+                    records = np.fromfile(path, dtype=SPILL_DTYPE)
+                    order = np.lexsort((records["h2"], records["h1"]))
+                    s = records[order]
+                    dup = np.zeros(len(s), dtype=bool)
+                    dup[1:] = (s["h1"][1:] == s["h1"][:-1]) & (s["h2"][1:] == s["h2"][:-1])
+                    drop.append(s["row"][dup])
+
+            drop = np.sort(np.concatenate(drop)) if drop else np.empty(0, dtype=np.int64)
+            if len(drop):
+                removed = drop_rows(output_file, drop)
+        finally:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+
+        return drop, removed
+
@@ -0,0 +1,199 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import sort_keys
+import spill
+
+# ==========================================
+# EXTERNAL MERGE SORT
+# ==========================================
+# The sorters used to spill cleaned chunks and then pd.concat all of them
+# back for one big sort_values, so peak memory was the whole dataset.
+# ExternalSorter keeps it bounded:
+#   1. add(): every chunk is stably sorted on the sort columns and spilled
+#      as a sorted run (binary, memory-mapped on read: see spill.py).
+#   2. merge(): at most `fan_in` runs are merged at a time, reading each in
+#      blocks of `block_rows`.  More runs than that are merged in passes
+#      (consecutive groups → longer intermediate runs) until one final pass
+#      streams into the output writer.
+# A merge step emits every buffered row whose key is below the smallest
+# "last key" of the run buffers -- no unread row can be smaller -- ordered
+# by (key, run, position), so the result equals one stable sort of the
+# concatenated input.  Rows are compared through one packed int64 key
+# (sort_keys.py): within a run the codes are local to the chunk, while
+# merging uses day number and the rank of state / district among all names
+# seen by any run (missing last).
+
+DEFAULT_FAN_IN = 16
+MIN_BLOCK_ROWS = 5_000
+
+
+def merge_block_rows(chunk_rows, fan_in):
+    # Run buffers of one merge pass together hold about one chunk
+    return max(MIN_BLOCK_ROWS, chunk_rows // (fan_in + 1))
+
+
+class ExternalSorter:
+
+    def __init__(self, sort_cols, spill_dir, prefix, fan_in=DEFAULT_FAN_IN, block_rows=50_000):
+        if fan_in < 2:
+            raise ValueError("fan_in must be at least 2")
+        self.sort_cols = list(sort_cols)
+        self.spill_dir = spill_dir
+        self.prefix = prefix
+        self.fan_in = fan_in
+        self.block_rows = block_rows
+        self.runs = []
+        self.rows = 0
+        self._spills = []        # every file written, for cleanup
+        # Values seen per key column, to rank them across runs at merge time
+        self._names = {col: set() for col in self.sort_cols}
+        self._levels = None
+        self._key_range = None
+
+    # ---------------- RUN GENERATION ----------------
+
+    def _spill_path(self):
+        path = os.path.join(self.spill_dir, f"{self.prefix}_run_{len(self._spills) + 1}.spill")
+        self._spills.append(path)
+        return path
+
+    def _track(self, chunk):
+        for col in self.sort_cols:
+            values = chunk[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                days = values.dropna().to_numpy(dtype="datetime64[D]").astype(np.int64)
+                self._names[col].update(np.unique(days).tolist())
+            else:
+                self._names[col].update(values.dropna().unique().tolist())
+
+    def add(self, chunk):
+        if len(chunk) == 0:
+            return
+        self._track(chunk)
+        run = sort_keys.sort_frame(chunk, self.sort_cols)
+        path = self._spill_path()
+        spill.write_run(run, path)
+        self.runs.append(path)
+        self.rows += len(run)
+
+    # ---------------- MERGING ----------------
+
+    def key(self, frame):
+        # Global key: codes are ranks among the values of all runs
+        columns = []
+        for col in self.sort_cols:
+            levels = self._levels[col]
+            values = frame[col]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                codes = levels.get_indexer(values.to_numpy(dtype="datetime64[D]").astype(np.int64))
+            else:
+                codes = levels.get_indexer(values.astype("string"))
+            codes[codes < 0] = len(levels)
+            columns.append((codes, len(levels)))
+        return sort_keys.pack(columns)[0]
+
+    def _blocks(self, run):
+        # run: a spill path, or (path, start, stop) for a slice of one
+        path, start, stop = run if isinstance(run, tuple) else (run, 0, None)
+        for block in spill.RunReader(path).iter_blocks(self.block_rows, start, stop):
+            if len(block):
+                yield block, self.key(block)
+
+    def _merge(self, runs, emit):
+        # Stable k-way merge of sorted runs; emit(frame) gets the output in order
+        readers = [self._blocks(path) for path in runs]
+        heads = [next(reader, None) for reader in readers]
+        pending = []
+        pending_rows = 0
+
+        while True:
+            live = [i for i, head in enumerate(heads) if head is not None]
+            if not live:
+                break
+            bound = min(heads[i][1][-1] for i in live)
+
+            pieces = []
+            for i in live:
+                frame, keys = heads[i]
+                n = int(np.searchsorted(keys, bound, side="left"))
+                if n:
+                    pieces.append((frame.iloc[:n], keys[:n]))
+                    heads[i] = (frame.iloc[n:], keys[n:])
+
+            if pieces:
+                merged = pd.concat([frame for frame, _ in pieces], ignore_index=True)
+                order = sort_keys.radix_argsort(np.concatenate([keys for _, keys in pieces]),
+                                                self._key_range)
+                out = merged.take(order)
+            else:
+                # Every buffer starts at `bound`: the earliest such run goes first
+                i = next(i for i in live if heads[i][1][0] == bound)
+                frame, keys = heads[i]
+                n = int(np.searchsorted(keys, bound, side="right"))
+                out = frame.iloc[:n]
+                heads[i] = (frame.iloc[n:], keys[n:])
+
+            pending.append(out)
+            pending_rows += len(out)
+            if pending_rows >= self.block_rows:
+                emit(pd.concat(pending, ignore_index=True))
+                pending = []
+                pending_rows = 0
+
+            for i in live:
+                if len(heads[i][1]) == 0:
+                    heads[i] = next(readers[i], None)
+
+        if pending:
+            emit(pd.concat(pending, ignore_index=True))
+
+    def _merge_to_run(self, runs):
+        path = self._spill_path()
+        written = []
+
+        def emit(frame):
+            spill.write_run(frame, path, append=bool(written))
+            written.append(len(frame))
+
+        self._merge(runs, emit)
+        for run in runs:
+            if run in self._spills:
+                os.remove(run)
+        return path
+
+    def levels(self):
+        # Sorted values of every key column over all runs
+        return {col: pd.Index(sorted(names)) for col, names in self._names.items()}
+
+    def set_levels(self, levels):
+        self._levels = levels
+        self._key_range = 1
+        for values in levels.values():
+            self._key_range *= len(values) + 1
+
+    def merge(self, emit):
+        # Stream all rows, sorted, to emit(frame) (e.g. TableWriter.write); returns the row count
+        if self._levels is None:
+            self.set_levels(self.levels())
+
+        passes = 0
+        runs = self.runs
+        while len(runs) > self.fan_in:
+            passes += 1
+            runs = [self._merge_to_run(runs[i:i + self.fan_in])
+                    for i in range(0, len(runs), self.fan_in)]
+            print(f"🔀 Merge pass {passes}: {len(runs)} runs left")
+        self.runs = runs
+
+        self._merge(runs, emit)
+        self.cleanup()
+        return self.rows
+
+    def cleanup(self):
+        for path in self._spills:
+            if os.path.exists(path):
+                os.remove(path)
+        self.runs = []
@@ -0,0 +1,269 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from storage import iter_chunks, read_columns, resolve_input
+
+# ==========================================
+# PINCODE → DISTRICT → STATE GAZETTEER
+# ==========================================
+# A dense lookup keyed by the integer pincode (6 digits → 1,000,000 slots):
+# state_idx[pin] / district_idx[pin] hold indices into the state / district
+# name arrays (-1 = unknown pincode).  Validation and repair of a whole
+# chunk is then a single vectorized gather instead of ever-growing
+# correction dicts.
+#
+# The index is built once from cleaned data (majority (state, district)
+# per pincode) or from a reference pincode directory CSV, and stored as a
+# small compressed .npz.
+
+PINCODE_SLOTS = 1_000_000
+GAZETTEER_NAME = "gazetteer.npz"
+
+REQUIRED_COLUMNS = ("pincode", "state", "district")
+
+MISSING_STATES = ("INVALID",)
+MISSING_DISTRICTS = ("Unknown",)
+
+# geo_check values written next to the data
+GEO_OK = "ok"
+GEO_FILLED = "filled"
+GEO_MISMATCH = "state_mismatch"
+GEO_DISTRICT_MISMATCH = "district_mismatch"
+GEO_UNKNOWN = "unknown_pincode"
+GEO_NO_PINCODE = "no_pincode"
+GEO_CHECK_VALUES = (GEO_OK, GEO_FILLED, GEO_MISMATCH, GEO_DISTRICT_MISMATCH, GEO_UNKNOWN, GEO_NO_PINCODE)
+
+REFERENCE_ALIASES = {
+    "pincode": ("pincode", "pin", "pin_code"),
+    "state": ("state", "statename", "state_name"),
+    "district": ("district", "districtname", "district_name"),
+}
+
+
+class Gazetteer:
+
+    def __init__(self, states, districts, state_idx, district_idx):
+        self.states = np.asarray(states, dtype=object)
+        self.districts = np.asarray(districts, dtype=object)
+        self.state_idx = state_idx
+        self.district_idx = district_idx
+
+    def __len__(self):
+        return int((self.state_idx >= 0).sum())
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            states=self.states.astype(str),
+            districts=self.districts.astype(str),
+            state_idx=self.state_idx,
+            district_idx=self.district_idx,
+        )
+
+    def districts_by_state(self):
+        # {state: [district, ...]} over every indexed pincode
+        known = self.state_idx >= 0
+        pairs = np.unique(np.stack([self.state_idx[known].astype(np.int64),
+                                    self.district_idx[known].astype(np.int64)]), axis=1)
+        out = {}
+        for s, d in pairs.T:
+            out.setdefault(str(self.states[s]), []).append(str(self.districts[d]))
+        return out
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["states"], data["districts"], data["state_idx"], data["district_idx"])
+
+    @classmethod
+    def from_table(cls, pincodes, states, districts):
+        # One (state, district) per pincode; later rows do not override earlier ones
+        pincodes = np.asarray(pincodes, dtype=np.int64)
+        state_codes, state_names = pd.factorize(pd.Series(states, dtype="string"), sort=True)
+        district_codes, district_names = pd.factorize(pd.Series(districts, dtype="string"), sort=True)
+
+        state_idx = np.full(PINCODE_SLOTS, -1, dtype=np.int16)
+        district_idx = np.full(PINCODE_SLOTS, -1, dtype=np.int32)
+        valid = (pincodes >= 0) & (pincodes < PINCODE_SLOTS)
+        # Reverse so the first row for a pincode is the one that sticks
+        pins = pincodes[valid][::-1]
+        state_idx[pins] = state_codes[valid][::-1]
+        district_idx[pins] = district_codes[valid][::-1]
+        return cls(np.asarray(state_names, dtype=object), np.asarray(district_names, dtype=object),
+                    state_idx, district_idx)
+
+# ==========================================
+# BUILDING
+# ==========================================
+
+
+def build_from_cleaned(paths, chunk_size=500_000):
+    # Majority (state, district) per pincode over all given cleaned files
+    counts = None
+    for path in paths:
+        print(f"  scanning {os.path.basename(path)}")
+        for chunk in iter_chunks(path, chunk_size, columns=list(REQUIRED_COLUMNS)):
+            pins = pd.to_numeric(chunk["pincode"], errors="coerce")
+            usable = (
+                pins.notna()
+                & chunk["state"].notna() & ~chunk["state"].isin(MISSING_STATES)
+                & chunk["district"].notna() & ~chunk["district"].isin(MISSING_DISTRICTS)
+            )
+            part = (
+                pd.DataFrame({
+                    "pincode": pins[usable].astype("int64"),
+                    "state": chunk["state"][usable].astype("string"),
+                    "district": chunk["district"][usable].astype("string"),
+                })
+                .groupby(["pincode", "state", "district"], observed=True)
+                .size()
+            )
+            counts = part if counts is None else counts.add(part, fill_value=0)
+
+    if counts is None or counts.empty:
+        raise ValueError("No usable (pincode, state, district) rows to build a gazetteer from")
+
+    best = (
+        counts.rename("n").reset_index()
+        .sort_values(["pincode", "n", "state", "district"], ascending=[True, False, True, True])
+        .drop_duplicates("pincode")
+    )
+    return Gazetteer.from_table(best["pincode"], best["state"], best["district"])
+
+
+def build_from_reference(path):
+    # Reference pincode directory: any CSV with pincode / state / district columns
+    columns = {c.lower().strip(): c for c in read_columns(path)}
+    picked = {}
+    for role, aliases in REFERENCE_ALIASES.items():
+        match = next((columns[a] for a in aliases if a in columns), None)
+        if match is None:
+            raise ValueError(f"Reference file {path} has no {role} column (tried {aliases})")
+        picked[role] = match
+
+    ref = pd.read_csv(path, usecols=list(picked.values()), dtype=str)
+    pins = pd.to_numeric(ref[picked["pincode"]], errors="coerce")
+    keep = pins.notna()
+    # Same normalization as the cleaners (strip + title case)
+    state = ref[picked["state"]][keep].str.strip().str.title()
+    district = ref[picked["district"]][keep].str.strip().str.title()
+    return Gazetteer.from_table(pins[keep].astype("int64"), state, district)
+
+# ==========================================
+# APPLYING
+# ==========================================
+
+_loaded = {}
+
+
+def get(path):
+    # Loaded once per process (each pool worker keeps its own copy)
+    if path not in _loaded:
+        _loaded[path] = Gazetteer.load(path)
+    return _loaded[path]
+
+
+def _pincode_ints(pincode):
+    codes, uniques = pd.factorize(pincode)
+    as_int = pd.to_numeric(pd.Series(np.asarray(uniques, dtype=object)), errors="coerce")
+    as_int = as_int.where((as_int >= 0) & (as_int < PINCODE_SLOTS)).fillna(-1).to_numpy(np.int64)
+    pins = np.full(len(codes), -1, dtype=np.int64)
+    valid = codes >= 0
+    pins[valid] = as_int[codes[valid]]
+    return pins
+
+
+def _fill(values, mask, names):
+    # Assign names[mask] into values, keeping a Categorical categorical
+    if not mask.any():
+        return values
+    new_values = names[mask]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        extra = sorted(set(new_values) - set(values.cat.categories))
+        if extra:
+            values = values.cat.add_categories(extra)
+    else:
+        values = values.copy()
+    values[mask] = new_values
+    return values
+
+
+def repair(chunk, gaz):
+    # Fill missing state/district from the pincode and flag disagreements
+    pins = _pincode_ints(chunk["pincode"])
+    known = pins >= 0
+    gs = np.full(len(pins), -1, dtype=np.int64)
+    gd = np.full(len(pins), -1, dtype=np.int64)
+    gs[known] = gaz.state_idx[pins[known]]
+    gd[known] = gaz.district_idx[pins[known]]
+    in_gaz = gs >= 0
+
+    state = chunk["state"]
+    district = chunk["district"]
+    state_missing = (state.isna() | state.isin(MISSING_STATES)).to_numpy()
+    district_missing = (district.isna() | district.isin(MISSING_DISTRICTS)).to_numpy()
+
+    fill_state = state_missing & in_gaz
+    fill_district = district_missing & in_gaz & (gd >= 0)
+    state_names = np.where(in_gaz, gaz.states[np.maximum(gs, 0)], None)
+    district_names = np.where(gd >= 0, gaz.districts[np.maximum(gd, 0)], None)
+
+    # Mismatch: a real state that differs from the pincode's state, or
+    # the right state with a real district other than the pincode's
+    row_state = state.astype("string").to_numpy(dtype=object, na_value=None)
+    mismatch = in_gaz & ~state_missing & (row_state != state_names)
+    row_district = district.astype("string").to_numpy(dtype=object, na_value=None)
+    district_mismatch = (gd >= 0) & ~mismatch & ~district_missing & (row_district != district_names)
+
+    check = np.full(len(pins), GEO_OK, dtype=object)
+    check[~known] = GEO_NO_PINCODE
+    check[known & ~in_gaz] = GEO_UNKNOWN
+    check[fill_state | fill_district] = GEO_FILLED
+    check[mismatch] = GEO_MISMATCH
+    check[district_mismatch] = GEO_DISTRICT_MISMATCH
+
+    chunk["state"] = _fill(state, fill_state, state_names)
+    chunk["district"] = _fill(district, fill_district, district_names)
+    chunk["geo_check"] = pd.Categorical(check, categories=GEO_CHECK_VALUES)
+    return chunk
+
+# ==========================================
+# CLI
+# ==========================================
+
+
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build the pincode → district → state gazetteer")
+    parser.add_argument("--reference", default=None,
+                        help="reference pincode directory CSV (pincode/state/district columns)")
+    parser.add_argument("--from-cleaned", nargs="*", default=None,
+                        help="cleaned files to take majority (state, district) per pincode from "
+                             "(default: all *_cleaned files next to this script)")
+    parser.add_argument("--out", default=os.path.join(base_dir, GAZETTEER_NAME))
+    args = parser.parse_args()
+
+    print("🗺️  Building gazetteer...")
+    if args.reference:
+        gaz = build_from_reference(args.reference)
+    else:
+        paths = args.from_cleaned or [
+            resolve_input(os.path.join(base_dir, f"{name}_cleaned.csv"))
+            for name in ("biometric", "demographic", "enrolment")
+        ]
+        paths = [p for p in paths if os.path.exists(p)]
+        if not paths:
+            raise FileNotFoundError("❌ No cleaned files found to build the gazetteer from")
+        gaz = build_from_cleaned(paths)
+
+    gaz.save(args.out)
+    print("✅ Gazetteer saved")
+    print(f"📍 Pincodes: {len(gaz):,}  States: {len(gaz.states)}  Districts: {len(gaz.districts)}")
+    print(f"📁 {args.out}")
+
+
+if __name__ == "__main__":
+    main()
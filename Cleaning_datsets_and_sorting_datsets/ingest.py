@@ -0,0 +1,113 @@
+import glob
+import os
+import queue
+import threading
+
+import pandas as pd
+
+import schema
+
+# ==========================================
+# MULTI-FILE RAW INGESTION
+# ==========================================
+# The API exports arrive as dozens of part files.  Instead of merging them
+# into one *_all.csv first, the cleaners can take a directory or glob and
+# stream the parts straight into the cleaning pipeline.  Parts are read
+# on background threads (pandas' C parser releases the GIL) into small
+# bounded queues and yielded in sorted file order, so the output does not
+# depend on which read finishes first.
+
+DEFAULT_READERS = 4
+QUEUE_CHUNKS = 2
+
+_DONE = object()
+
+
+def is_multi_source(source):
+    return os.path.isdir(source) or any(ch in source for ch in "*?[")
+
+
+def expand_inputs(source):
+    # File, directory (all *.csv inside) or glob pattern → sorted list of files
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, "*.csv"))
+    elif is_multi_source(source):
+        paths = glob.glob(source)
+    else:
+        paths = [source]
+    paths = sorted(p for p in paths if os.path.isfile(p))
+    if not paths:
+        raise FileNotFoundError(f"No input CSV files found for: {source}")
+    return paths
+
+
+def read_header(path):
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def check_headers(paths):
+    # All parts must carry the same columns; order may differ and is
+    # realigned to the first part's header while reading
+    reference = read_header(paths[0])
+    problems = []
+    for path in paths[1:]:
+        header = read_header(path)
+        if header != reference and sorted(header) != sorted(reference):
+            missing = sorted(set(reference) - set(header))
+            extra = sorted(set(header) - set(reference))
+            problems.append(f"{os.path.basename(path)}: missing {missing}, unexpected {extra}")
+    if problems:
+        raise ValueError(
+            "Inconsistent headers across input parts (reference: "
+            f"{os.path.basename(paths[0])}):\n  " + "\n  ".join(problems)
+        )
+    return reference
+
+
+def _read_part(path, header, chunk_size, out, dataset):
+    try:
+        for chunk in schema.iter_csv(path, dataset, chunk_size, raw=True):
+            if list(chunk.columns) != header:
+                chunk = chunk[header]
+            out.put(chunk)
+        out.put(_DONE)
+    except BaseException as exc:  # surfaced in the consumer thread
+        out.put(exc)
+
+
+def iter_parts(paths, header, chunk_size, readers=DEFAULT_READERS, rows_per_part=None,
+               dataset=None):
+    # Yields chunks of all parts in file order while up to `readers` files
+    # are parsed ahead in the background.  rows_per_part (dict) is filled
+    # with the raw row count of every part as it is consumed.
+    readers = max(1, readers)
+    started = []
+    next_part = 0
+
+    def start_next():
+        nonlocal next_part
+        if next_part >= len(paths):
+            return
+        out = queue.Queue(maxsize=QUEUE_CHUNKS)
+        thread = threading.Thread(
+            target=_read_part, args=(paths[next_part], header, chunk_size, out, dataset), daemon=True
+        )
+        thread.start()
+        started.append((paths[next_part], out))
+        next_part += 1
+
+    for _ in range(readers):
+        start_next()
+
+    while started:
+        path, out = started.pop(0)
+        while True:
+            item = out.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            if rows_per_part is not None:
+                rows_per_part[path] = rows_per_part.get(path, 0) + len(item)
+            yield item
+        start_next()
@@ -0,0 +1,248 @@
+import hashlib
+import io
+import json
+import os
+
+import schema
+
+# ==========================================
+# INCREMENTAL CLEANING MANIFEST
+# ==========================================
+# The raw *_all.csv files only ever grow by appends.  After every run a
+# manifest next to the output records how far into the input we got (a
+# byte offset at a line boundary), the header, row counts and a SHA-256
+# per processed byte segment.  The next --incremental run re-verifies
+# those segments and, if nothing before the offset changed, cleans only
+# the new tail and appends it.  Any mismatch means a full rebuild.
+#
+# With multi-file input (a directory or glob of part files) the same idea
+# works per file: parts recorded in the manifest must be unchanged, and
+# only part files that are new since the last run get cleaned.
+
+MANIFEST_VERSION = 1
+BLOCK_SIZE = 1 << 20
+QUICK_CHECK_BYTES = 1 << 20
+
+
+def manifest_path(output_file):
+    return output_file + ".manifest.json"
+
+
+def dedup_state_path(output_file):
+    return output_file + ".dedup.npz"
+
+
+def config_fingerprint(spec, output_format, extra=None):
+    # extra: other inputs that change the output (e.g. the gazetteer's hash)
+    config = {"rules": repr(spec["rules"]), "format": output_format, "schema": schema.SCHEMA_VERSION}
+    if extra:
+        config["extra"] = extra
+    payload = json.dumps(config, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def hash_range(path, start, end):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    return hash_range(path, 0, os.path.getsize(path))
+
+
+def complete_lines_end(path, size):
+    # Byte offset just past the last newline at or before `size`
+    with open(path, "rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(BLOCK_SIZE, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            idx = block.rfind(b"\n")
+            if idx >= 0:
+                return pos - step + idx + 1
+            pos -= step
+    return 0
+
+
+class BoundedReader(io.RawIOBase):
+    # Read-only view of bytes [start, end) of a file, for pd.read_csv
+
+    def __init__(self, path, start, end):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:min(len(buffer), self._remaining)]
+        n = self._file.readinto(view)
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_range(path, start, end):
+    return io.BufferedReader(BoundedReader(path, start, end), buffer_size=BLOCK_SIZE)
+
+# ==========================================
+# LOAD / CHECK / SAVE
+# ==========================================
+
+
+def load_manifest(output_file):
+    path = manifest_path(output_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def check_resume(manifest, input_file, output_file, header, fingerprint, verify="full"):
+    # Returns (ok, reason)
+    if manifest is None:
+        return False, "no manifest"
+    if "offset" not in manifest:
+        return False, "manifest was written for multi-file input"
+    if manifest.get("version") != MANIFEST_VERSION:
+        return False, "manifest version changed"
+    if manifest.get("fingerprint") != fingerprint:
+        return False, "cleaning rules, output format or gazetteer changed"
+    if manifest.get("header") != header:
+        return False, "input header changed"
+    if not os.path.exists(output_file):
+        return False, "output missing"
+    if not os.path.exists(dedup_state_path(output_file)):
+        return False, "dedup state missing"
+
+    offset = manifest["offset"]
+    size = os.path.getsize(input_file)
+    if size < offset:
+        return False, "input shrank"
+    if manifest.get("ends_mid_line") and size != offset:
+        return False, "last line was unterminated and the file changed"
+
+    if verify == "quick":
+        start = max(0, offset - QUICK_CHECK_BYTES)
+        if hash_range(input_file, start, offset) != manifest["tail_sha256"]:
+            return False, "earlier bytes changed"
+    else:
+        for segment in manifest["segments"]:
+            if hash_range(input_file, segment["start"], segment["end"]) != segment["sha256"]:
+                return False, f"earlier bytes changed (segment at {segment['start']:,})"
+
+    return True, f"resuming at byte {offset:,}"
+
+
+def save_manifest(output_file, manifest):
+    path = manifest_path(output_file)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_manifest(previous, dataset, input_file, header, fingerprint,
+                   start, end, ends_mid_line, rows_in, rows_out):
+    segments = list(previous["segments"]) if previous else []
+    if end > start:
+        segments.append({"start": start, "end": end, "sha256": hash_range(input_file, start, end)})
+    return {
+        "version": MANIFEST_VERSION,
+        "dataset": dataset,
+        "input_file": os.path.abspath(input_file),
+        "header": header,
+        "fingerprint": fingerprint,
+        "offset": end,
+        "ends_mid_line": ends_mid_line,
+        "rows_in": (previous["rows_in"] if previous else 0) + rows_in,
+        "rows_out": rows_out,
+        "segments": segments,
+        "tail_sha256": hash_range(input_file, max(0, end - QUICK_CHECK_BYTES), end),
+    }
+
+# ==========================================
+# MULTI-FILE (PART) MANIFESTS
+# ==========================================
+
+
+def part_record(path, rows_in=0):
+    size = os.path.getsize(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": size,
+        "sha256": file_sha256(path),
+        "tail_sha256": hash_range(path, max(0, size - QUICK_CHECK_BYTES), size),
+        "rows_in": rows_in,
+    }
+
+
+def check_resume_parts(manifest, paths, output_file, header, fingerprint, verify="full"):
+    # Returns (ok, reason, paths_to_clean)
+    if manifest is None or "parts" not in manifest:
+        return False, "no multi-file manifest", paths
+    if manifest.get("version") != MANIFEST_VERSION:
+        return False, "manifest version changed", paths
+    if manifest.get("fingerprint") != fingerprint:
+        return False, "cleaning rules, output format or gazetteer changed", paths
+    if manifest.get("header") != header:
+        return False, "input header changed", paths
+    if not os.path.exists(output_file) or not os.path.exists(dedup_state_path(output_file)):
+        return False, "output or dedup state missing", paths
+
+    current = {os.path.abspath(p) for p in paths}
+    for part in manifest["parts"]:
+        path = part["path"]
+        name = os.path.basename(path)
+        if path not in current:
+            return False, f"part {name} disappeared", paths
+        size = os.path.getsize(path)
+        if size != part["size"]:
+            return False, f"part {name} changed size", paths
+        if verify == "quick":
+            changed = hash_range(path, max(0, size - QUICK_CHECK_BYTES), size) != part["tail_sha256"]
+        else:
+            changed = hash_range(path, 0, size) != part["sha256"]
+        if changed:
+            return False, f"part {name} changed", paths
+
+    # New parts must sort after the processed ones, or a full run would
+    # interleave them differently
+    known = [part["path"] for part in manifest["parts"]]
+    new_paths = [p for p in paths if os.path.abspath(p) not in set(known)]
+    if known and new_paths and os.path.abspath(new_paths[0]) < max(known):
+        return False, "a new part sorts before already processed parts", paths
+    return True, f"{len(known)} parts unchanged, {len(new_paths)} new", new_paths
+
+
+def build_parts_manifest(previous, dataset, header, fingerprint, new_parts, rows_out):
+    parts = list(previous["parts"]) if previous else []
+    parts.extend(new_parts)
+    return {
+        "version": MANIFEST_VERSION,
+        "dataset": dataset,
+        "header": header,
+        "fingerprint": fingerprint,
+        "parts": parts,
+        "rows_in": sum(part["rows_in"] for part in parts),
+        "rows_out": rows_out,
+    }
@@ -0,0 +1,116 @@
+import re
+
+# ==========================================
+# MEMORY-ADAPTIVE CHUNK SIZING
+# ==========================================
+# Instead of a fixed CHUNK_SIZE, a stage can be given a memory budget
+# (--max-memory 4G).  The first chunk is read small, cleaned, and measured
+# (raw + cleaned bytes per row); from that the chunk size for the rest of
+# the run -- and, for the cleaners, how many worker processes fit -- is
+# derived.  The readers consult a ChunkSizer before every chunk, so the
+# new size takes effect without re-opening the input.  A budget that does
+# not fit even one process with MIN_CHUNK_ROWS-row chunks is an error,
+# not silently exceeded.
+
+SAMPLE_ROWS = 50_000
+MIN_CHUNK_ROWS = 10_000
+MAX_CHUNK_ROWS = 2_000_000
+MIN_USEFUL_ROWS = 50_000        # below this, fewer workers with bigger chunks win
+
+# Temporaries alive while a chunk is cleaned (dedup copy, hashes,
+# factorized uniques, the pickled copy shipped to a worker)
+CLEANING_OVERHEAD = 3.0
+PROCESS_BASE_BYTES = 200 << 20  # interpreter + pandas/pyarrow per process
+DEDUP_SHARE = 0.25              # of the budget, unless --dedup-memory-mb is given
+
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*$", re.IGNORECASE)
+
+
+def parse_size(text):
+    # "4G", "512M", "1.5GiB", "800000000" → bytes
+    match = SIZE_PATTERN.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid memory size: {text!r} (use e.g. 4G, 512M)")
+    number, unit = match.groups()
+    return int(float(number) * UNITS[unit.upper()])
+
+
+def format_size(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def frame_bytes(frame):
+    return int(frame.memory_usage(deep=True, index=True).sum())
+
+
+class ChunkSizer:
+    # Callable handed to the readers as chunk size; retuned after sampling
+
+    def __init__(self, rows=SAMPLE_ROWS):
+        self.rows = rows
+
+    def __call__(self):
+        return self.rows
+
+
+def _clamp(rows):
+    return int(max(MIN_CHUNK_ROWS, min(MAX_CHUNK_ROWS, rows)))
+
+
+def check_budget(budget_bytes, reserved_bytes=0):
+    # Fail before any work when the budget cannot even hold the process
+    fixed = reserved_bytes + PROCESS_BASE_BYTES
+    if budget_bytes <= fixed:
+        raise ValueError(f"Memory budget {format_size(budget_bytes)} is too small: {format_size(fixed)} "
+                         f"is taken before any rows are read")
+
+
+def _check_fits(budget_bytes, fixed_bytes, per_row, live_chunks):
+    # Raise if the smallest chunk size would not fit the budget
+    needed = fixed_bytes + MIN_CHUNK_ROWS * per_row * live_chunks
+    if needed > budget_bytes:
+        raise ValueError(
+            f"Memory budget {format_size(budget_bytes)} is too small: {MIN_CHUNK_ROWS:,}-row chunks "
+            f"need at least {format_size(needed)} (~{int(per_row):,} bytes/row in {live_chunks} "
+            f"live chunks + {format_size(fixed_bytes)} fixed)")
+
+
+def plan_cleaning(budget_bytes, rows, raw_bytes, cleaned_bytes, workers,
+                  reader_chunks=0, reserved_bytes=0):
+    # Chunk rows / workers / in-flight chunks that keep the cleaning stage
+    # under budget, from a sample of `rows` rows measured before and after
+    # cleaning.  reader_chunks: raw chunks buffered by background readers.
+    rows = max(rows, 1)
+    raw_per_row = raw_bytes / rows
+    cleaned_per_row = cleaned_bytes / rows
+    per_row = (raw_per_row + cleaned_per_row) * CLEANING_OVERHEAD
+
+    available = budget_bytes - reserved_bytes - PROCESS_BASE_BYTES
+    for n in range(max(1, workers), 0, -1):
+        max_in_flight = 2 * n if n > 1 else 1
+        live_chunks = max_in_flight + 1 + reader_chunks      # + the one being written
+        worker_bytes = PROCESS_BASE_BYTES * n if n > 1 else 0
+        chunk_rows = (available - worker_bytes) / (per_row * live_chunks)
+        if chunk_rows >= MIN_USEFUL_ROWS or n == 1:
+            break
+
+    _check_fits(budget_bytes, reserved_bytes + PROCESS_BASE_BYTES, per_row, live_chunks)
+    return {
+        "chunk_rows": _clamp(chunk_rows),
+        "workers": n,
+        "max_in_flight": max_in_flight if n > 1 else None,
+        "bytes_per_row": int(raw_per_row + cleaned_per_row),
+    }
+
+
+def plan_serial(budget_bytes, rows, raw_bytes, cleaned_bytes, live_chunks=2):
+    # Single-process stages (the sorters): raw + cleaned chunk plus temporaries
+    per_row = (raw_bytes + cleaned_bytes) / max(rows, 1) * CLEANING_OVERHEAD
+    _check_fits(budget_bytes, PROCESS_BASE_BYTES, per_row, live_chunks)
+    available = budget_bytes - PROCESS_BASE_BYTES
+    return _clamp(available / (per_row * live_chunks))
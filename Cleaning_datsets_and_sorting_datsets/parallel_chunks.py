@@ -0,0 +1,41 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# ==========================================
+# ORDERED PARALLEL CHUNK MAP
+# ==========================================
+# Chunks are handed to a pool of worker processes, but results are yielded
+# strictly in input order so a single writer can append them exactly as the
+# serial loop would.  At most `max_in_flight` chunks are queued or being
+# cleaned at any time, which keeps memory capped no matter how far the
+# reader could run ahead of the writer.
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def ordered_map(func, items, workers=1, max_in_flight=None):
+    # workers <= 1 keeps the original single-process behaviour (no pickling)
+    if workers is None or workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    max_in_flight = max(1, max_in_flight)
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
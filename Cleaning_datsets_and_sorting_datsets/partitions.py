@@ -0,0 +1,256 @@
+import json
+import os
+import shutil
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+import sort_keys
+from date_cache import parse_iso_dates
+from storage import EXTENSIONS, TableWriter, is_date_column, read_table
+
+# ==========================================
+# HIVE-STYLE PARTITIONED OUTPUT
+# ==========================================
+# Instead of one big *_sorted file the sorters can write
+#   <name>_sorted/date=2025-03-01/state=Maharashtra/part-00000.parquet
+# (or .csv).  The partition columns live only in the directory names, as in
+# Hive / pyarrow.dataset (values are URI-encoded, missing values use Hive's
+# default partition name).  Rows arrive sorted, so each partition is one
+# contiguous stretch and only one file is open at a time.
+#
+# _partitions.json at the root lists every partition with its row count
+# and min / max per column, so readers can skip partitions by date range,
+# state or any column range without opening them.
+
+MANIFEST_NAME = "_partitions.json"
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+PARTITION_COLUMNS = ("date", "state")
+
+
+def manifest_path(root):
+    return os.path.join(root, MANIFEST_NAME)
+
+
+def is_partitioned(root):
+    return os.path.isfile(manifest_path(root))
+
+
+def _format_value(value):
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d") if value == value.normalize() else value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (int, float)):
+        return value
+    return str(value)
+
+
+def _dir_name(col, value):
+    value = _format_value(value)
+    return f"{col}={DEFAULT_PARTITION if value is None else quote(str(value), safe='')}"
+
+
+def _column_stats(values):
+    # (min, max) of the non-missing values, JSON-friendly (None if all missing)
+    values = values.dropna()
+    if len(values) == 0:
+        return None, None
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("string")
+    return _format_value(values.min()), _format_value(values.max())
+
+
+def _merge_stats(stats, frame):
+    for col in frame.columns:
+        low, high = _column_stats(frame[col])
+        if low is None:
+            continue
+        old_low, old_high = stats.get(col, (None, None))
+        stats[col] = (low if old_low is None else min(old_low, low),
+                      high if old_high is None else max(old_high, high))
+
+# ==========================================
+# WRITING
+# ==========================================
+
+
+class PartitionedWriter:
+    # write() takes sorted blocks (e.g. ExternalSorter.merge output); the
+    # dataset replaces `root` only when close() succeeds
+
+    def __init__(self, root, dataset, partition_cols=PARTITION_COLUMNS, fmt="parquet"):
+        self.root = root
+        self.dataset = dataset
+        self.partition_cols = list(partition_cols)
+        self.ext = EXTENSIONS[fmt]
+        self.fmt = fmt
+        self._tmp_root = root + ".tmp"
+        if os.path.exists(self._tmp_root):
+            shutil.rmtree(self._tmp_root)
+        os.makedirs(self._tmp_root)
+        self.partitions = []
+        self.columns = None         # full column order, partition columns included
+        self._parts_per_dir = {}
+        self._current = None        # (values, writer, record, stats)
+
+    def _open(self, values):
+        rel_dir = os.path.join(*(_dir_name(c, v) for c, v in zip(self.partition_cols, values)))
+        part_no = self._parts_per_dir.get(rel_dir, 0)
+        self._parts_per_dir[rel_dir] = part_no + 1
+        os.makedirs(os.path.join(self._tmp_root, rel_dir), exist_ok=True)
+        rel_path = os.path.join(rel_dir, f"part-{part_no:05d}{self.ext}")
+        record = {
+            "path": rel_path.replace(os.sep, "/"),
+            "values": {c: _format_value(v) for c, v in zip(self.partition_cols, values)},
+            "rows": 0,
+        }
+        writer = TableWriter(os.path.join(self._tmp_root, rel_path))
+        self._current = (values, writer, record, {})
+
+    def _close_current(self):
+        if self._current is None:
+            return
+        _, writer, record, stats = self._current
+        writer.close()
+        record["min"] = {col: low for col, (low, _) in stats.items()}
+        record["max"] = {col: high for col, (_, high) in stats.items()}
+        self.partitions.append(record)
+        self._current = None
+
+    def write(self, block):
+        if len(block) == 0:
+            return
+        if self.columns is None:
+            self.columns = list(block.columns)
+        # Split the block where the partition key changes
+        key, _ = sort_keys.frame_key(block, self.partition_cols)
+        starts = np.concatenate([[0], np.flatnonzero(key[1:] != key[:-1]) + 1, [len(block)]])
+        data_cols = [c for c in block.columns if c not in self.partition_cols]
+
+        for lo, hi in zip(starts[:-1], starts[1:]):
+            piece = block.iloc[lo:hi]
+            values = tuple(piece[c].iloc[0] for c in self.partition_cols)
+            if self._current is None or not self._same(self._current[0], values):
+                self._close_current()
+                self._open(values)
+            _, writer, record, stats = self._current
+            data = piece[data_cols]
+            writer.write(data)
+            record["rows"] += len(data)
+            _merge_stats(stats, data)
+
+    @staticmethod
+    def _same(a, b):
+        return all((pd.isna(x) and pd.isna(y)) or x == y for x, y in zip(a, b))
+
+    def close(self):
+        self._close_current()
+        manifest = {
+            "dataset": self.dataset,
+            "format": self.fmt,
+            "partition_columns": self.partition_cols,
+            "columns": self.columns or self.partition_cols,
+            "rows": sum(p["rows"] for p in self.partitions),
+            "partitions": self.partitions,
+        }
+        with open(manifest_path(self._tmp_root), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, ensure_ascii=False)
+
+        # Only ever replace a directory this module wrote
+        if os.path.exists(self.root):
+            if not is_partitioned(self.root):
+                raise FileExistsError(f"{self.root} exists and is not a partitioned dataset")
+            shutil.rmtree(self.root)
+        os.replace(self._tmp_root, self.root)
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            if self._current is not None:
+                self._current[1].close()
+            shutil.rmtree(self._tmp_root, ignore_errors=True)
+
+# ==========================================
+# READING (WITH PRUNING)
+# ==========================================
+
+
+def load_manifest(root):
+    with open(manifest_path(root), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _in_range(low, high, lo, hi):
+    # Partition [low, high] overlaps the wanted [lo, hi] (None = open end)
+    if low is None:
+        return False
+    return (lo is None or high >= lo) and (hi is None or low <= hi)
+
+
+def select_partitions(manifest, start=None, end=None, states=None, ranges=None):
+    # start / end: 'YYYY-MM-DD' (inclusive); states: names; ranges: {col: (lo, hi)}
+    # checked against the per-partition min / max
+    date_col = next((c for c in manifest["partition_columns"] if is_date_column(c)), None)
+    state_col = "state" if "state" in manifest["partition_columns"] else None
+    states = set(states) if states else None
+    chosen = []
+    for part in manifest["partitions"]:
+        values = part["values"]
+        if (start or end) and date_col:
+            day = values[date_col]
+            if not _in_range(day, day, start, end):
+                continue
+        if states is not None and state_col and values[state_col] not in states:
+            continue
+        if ranges and not all(
+            _in_range(part["min"].get(col), part["max"].get(col), lo, hi)
+            for col, (lo, hi) in ranges.items()
+        ):
+            continue
+        chosen.append(part)
+    return chosen
+
+
+def read_partitions(root, columns=None, start=None, end=None, states=None, ranges=None):
+    # Matching rows in dataset (sorted) order, with the partition columns
+    # restored (dates parsed, states categorical); range columns must be read
+    manifest = load_manifest(root)
+    partition_cols = manifest["partition_columns"]
+    chosen = select_partitions(manifest, start, end, states, ranges)
+    data_cols = None if columns is None else [c for c in columns if c not in partition_cols]
+
+    frames = []
+    for part in chosen:
+        frame = read_table(os.path.join(root, part["path"]), columns=data_cols,
+                           dataset=manifest["dataset"])
+        for col in partition_cols:
+            if columns is None or col in columns:
+                frame[col] = part["values"][col]
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=columns or partition_cols)
+
+    df = pd.concat(frames, ignore_index=True)
+    for col in partition_cols:
+        if col not in df.columns:
+            continue
+        if is_date_column(col):
+            df[col] = parse_iso_dates(df[col])
+        else:
+            df[col] = df[col].astype("category")
+    if ranges:
+        keep = np.ones(len(df), dtype=bool)
+        for col, (lo, hi) in ranges.items():
+            values = df[col]
+            keep &= ((lo is None or values >= lo) & (hi is None or values <= hi)).to_numpy(dtype=bool, na_value=False)
+        df = df[keep].reset_index(drop=True)
+    return df[columns or manifest["columns"]]
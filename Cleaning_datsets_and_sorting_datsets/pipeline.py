@@ -0,0 +1,323 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import cleaning_engine
+import ingest
+import manifest
+import memory_budget
+import schema
+import sort_engine
+from external_sort import DEFAULT_FAN_IN
+from gazetteer import GAZETTEER_NAME
+from partitions import manifest_path as partitions_manifest
+from seek_index import LEVELS, index_path
+from storage import FORMATS, with_format
+
+# ==========================================
+# FUSED CLEAN → SORT PIPELINE
+# ==========================================
+# Runs the cleaning and sorting stages of the chosen datasets.  Every stage
+# leaves <output>.stage.json with a fingerprint of its config (rules,
+# format, gazetteer, ...) and a signature of each input and output file
+# (size + mtime; --verify full adds a SHA-256 of the inputs).  A stage
+# whose record still matches is skipped, so the nightly job only pays for
+# what changed.  With --parts the raw input is a directory / glob of part
+# files and every part is an input of its own: a new, removed or modified
+# part re-runs the clean stage.
+#
+# When both stages have to run they share one streaming pass: the cleaner's
+# writer hands every chunk it writes (as read_table would return it) to the
+# sorter, instead of the sorter reading and parsing *_cleaned.* again.  If
+# the cleaned file ends up holding other rows than the sorter saw (late
+# duplicates dropped from a spilled dedup partition, or an --incremental
+# append) the sort is redone from the cleaned file.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGE_VERSION = 1
+STAGES = ("clean", "sort")
+
+# ==========================================
+# STAGE RECORDS
+# ==========================================
+
+
+def stage_path(output_file):
+    return output_file + ".stage.json"
+
+
+def file_signature(path, verify="quick"):
+    stat = os.stat(path)
+    signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if verify == "full":
+        signature["sha256"] = manifest.file_sha256(path)
+    return signature
+
+
+def fingerprint(config):
+    payload = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _input_unchanged(old, path, verify):
+    if not os.path.isfile(path):
+        return False
+    stat = os.stat(path)
+    if stat.st_size != old["size"]:
+        return False
+    if verify == "full":
+        # Content decides: a touched but identical file is unchanged
+        return "sha256" in old and manifest.file_sha256(path) == old["sha256"]
+    return stat.st_mtime_ns == old["mtime_ns"]
+
+
+def check_stage(output_file, inputs, config, verify="quick"):
+    # Returns (up_to_date, reason)
+    path = stage_path(output_file)
+    if not os.path.exists(path):
+        return False, "never run"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return False, "stage record unreadable"
+    if record.get("version") != STAGE_VERSION or record.get("config") != fingerprint(config):
+        return False, "config changed"
+    if sorted(record["inputs"]) != sorted(os.path.abspath(p) for p in inputs):
+        return False, "inputs changed"
+    for input_path, old in record["inputs"].items():
+        if not _input_unchanged(old, input_path, verify):
+            return False, f"{os.path.basename(input_path)} changed"
+    for output_path, old in record["outputs"].items():
+        if not os.path.exists(output_path) or file_signature(output_path) != old:
+            return False, f"{os.path.basename(output_path)} missing or modified"
+    return True, "up to date"
+
+
+def save_stage(output_file, inputs, outputs, config, verify="quick"):
+    record = {
+        "version": STAGE_VERSION,
+        "config": fingerprint(config),
+        "inputs": {os.path.abspath(p): file_signature(p, verify) for p in inputs},
+        "outputs": {os.path.abspath(p): file_signature(p) for p in outputs},
+    }
+    path = stage_path(output_file)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+# ==========================================
+# STAGE DEFINITIONS
+# ==========================================
+
+
+def clean_stage(name, args):
+    spec = cleaning_engine.DATASET_SPECS[name]
+    output_file = with_format(os.path.join(BASE_DIR, f"{name}_cleaned.csv"), args.output_format)
+    if args.parts:
+        source = args.parts.format(name=name)
+        inputs = ingest.expand_inputs(source)
+    else:
+        source = os.path.join(BASE_DIR, f"{name}_all.csv")
+        inputs = [source]
+    if args.gazetteer:
+        inputs.append(args.gazetteer)
+    config = {
+        "stage": "clean",
+        "fingerprint": manifest.config_fingerprint(spec, args.output_format),
+        "quarantine": not args.no_quarantine,
+    }
+    return {"spec": spec, "source": source, "inputs": inputs, "output": output_file,
+            "outputs": [output_file], "config": config}
+
+
+def sort_stage(name, args, cleaned_file):
+    spec = sort_engine.SORT_SPECS[name]
+    output_file = with_format(os.path.join(BASE_DIR, f"{name}_sorted.csv"), args.output_format)
+    inputs = [cleaned_file]
+    if args.partitioned:
+        output_file = os.path.splitext(output_file)[0]
+        outputs = [partitions_manifest(output_file)]
+    elif args.seek_index != "none":
+        outputs = [output_file, index_path(output_file)]
+    else:
+        outputs = [output_file]
+    if args.fuzzy:
+        # The canonical names come from the gazetteer when one is built
+        gazetteer_path = args.canonical_gazetteer or os.path.join(BASE_DIR, GAZETTEER_NAME)
+        if os.path.isfile(gazetteer_path):
+            inputs.append(gazetteer_path)
+    config = {
+        "stage": "sort",
+        "rules": spec["rules"],
+        "fuzzy": args.fuzzy,
+        "format": args.output_format,
+        "partitioned": args.partitioned,
+        "seek_index": None if args.partitioned else args.seek_index,
+        "schema": schema.SCHEMA_VERSION,
+    }
+    return {"spec": spec, "inputs": inputs, "output": output_file,
+            "outputs": outputs, "config": config}
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+
+def clean_options(args):
+    return {
+        "workers": args.workers,
+        "output_format": args.output_format,
+        "incremental": args.incremental,
+        "verify": args.verify,
+        "gazetteer_path": args.gazetteer,
+        "quarantine": not args.no_quarantine,
+        "max_memory": args.max_memory,
+        "readers": args.readers,
+    }
+
+
+def sort_options(args):
+    return {
+        "output_format": args.output_format,
+        "fuzzy": args.fuzzy,
+        "gazetteer_path": args.canonical_gazetteer,
+        "partitioned": args.partitioned,
+        "seek_index": args.seek_index,
+        "fan_in": args.fan_in,
+        "workers": args.sort_workers,
+    }
+
+
+def run_dataset(name, args):
+    # Returns [(stage, status, seconds)]
+    report = []
+    clean = clean_stage(name, args)
+    sort = sort_stage(name, args, clean["output"])
+
+    clean_todo = "clean" in args.stages
+    if clean_todo and not args.force:
+        fresh, reason = check_stage(clean["output"], clean["inputs"], clean["config"], args.verify)
+        clean_todo = not fresh
+        print(f"🔎 {name} clean: {reason}")
+    sort_todo = "sort" in args.stages
+    if sort_todo and not args.force and not clean_todo:
+        fresh, reason = check_stage(sort["output"], sort["inputs"], sort["config"], args.verify)
+        sort_todo = not fresh
+        print(f"🔎 {name} sort: {reason}")
+
+    if "clean" in args.stages and not clean_todo:
+        report.append(("clean", "skipped", 0.0))
+    if "sort" in args.stages and not sort_todo:
+        report.append(("sort", "skipped", 0.0))
+    if args.dry_run:
+        report += [(stage, "would run", 0.0) for stage, todo in (("clean", clean_todo), ("sort", sort_todo)) if todo]
+        return report
+
+    sorted_rows = None
+    if clean_todo:
+        started = time.perf_counter()
+        job = sort_engine.SortJob(sort["spec"], sort["output"], **sort_options(args)) if sort_todo else None
+        try:
+            rows = cleaning_engine.run_cleaning(
+                clean["spec"], clean["source"], clean["output"],
+                tee=job.add if job else None, **clean_options(args))
+        except BaseException:
+            if job:
+                job.abort()
+            raise
+        save_stage(clean["output"], clean["inputs"], clean["outputs"], clean["config"], args.verify)
+
+        if job and job.rows == rows:
+            # Sorted from the cleaner's chunks: one pass over the data
+            sorted_rows = job.finish()
+            report.append(("clean+sort", "fused", time.perf_counter() - started))
+        else:
+            if job:
+                print(f"⚠️  cleaned file has {rows:,} rows, sorter saw {job.rows:,}: sorting from the file")
+                job.abort()
+            report.append(("clean", "ran", time.perf_counter() - started))
+
+    if sort_todo and sorted_rows is None:
+        started = time.perf_counter()
+        sorted_rows = sort_engine.run_sorting(sort["spec"], clean["output"], sort["output"],
+                                              max_memory=args.max_memory, **sort_options(args))
+        report.append(("sort", "ran", time.perf_counter() - started))
+    if sort_todo:
+        save_stage(sort["output"], sort["inputs"], sort["outputs"], sort["config"], args.verify)
+    return report
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Clean and sort the datasets in one pass, skipping stages whose inputs did not change")
+    parser.add_argument("datasets", nargs="*",
+                        help=f"datasets to run: {', '.join(sorted(cleaning_engine.DATASET_SPECS))} (default: all)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES),
+                        help="stages to run (default: clean sort)")
+    parser.add_argument("--force", action="store_true",
+                        help="run every requested stage even if it is up to date")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only report which stages would run")
+    parser.add_argument("--verify", choices=("quick", "full"), default="quick",
+                        help="input check: size + mtime, or a SHA-256 of every input "
+                             "(also used by --incremental cleaning)")
+    parser.add_argument("--output-format", choices=FORMATS, default="csv",
+                        help="format of the cleaned and sorted files")
+    # Cleaning
+    parser.add_argument("--parts", default=None,
+                        help="raw input as a directory or glob of part files instead of <dataset>_all.csv; "
+                             "{name} is replaced by the dataset, e.g. 'exports/{name}/*.csv'")
+    parser.add_argument("--readers", type=int, default=ingest.DEFAULT_READERS,
+                        help="part files read concurrently with --parts")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes for cleaning (1 = serial)")
+    parser.add_argument("--max-memory", type=memory_budget.parse_size, default=None,
+                        help="memory budget, e.g. 4G (cleaning chunk size / workers; sort chunk size)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="clean only rows appended since the last run "
+                             "(Parquet output is still rewritten as a whole to append them)")
+    parser.add_argument("--gazetteer", default=None,
+                        help="pincode gazetteer for the cleaning repair step (see clean_*.py --gazetteer)")
+    parser.add_argument("--no-quarantine", action="store_true",
+                        help="skip the quarantine files of rejected / repaired rows")
+    # Sorting
+    parser.add_argument("--sort-workers", type=int, default=1,
+                        help="processes for the parallel sample sort")
+    parser.add_argument("--fan-in", type=int, default=DEFAULT_FAN_IN,
+                        help="sorted runs merged at once")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="sorting: also canonicalize spellings the correction dicts miss")
+    parser.add_argument("--canonical-gazetteer", default=None,
+                        help=f"gazetteer with canonical districts for sorting (default: {GAZETTEER_NAME} if built)")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="write the sorted output as a Hive-style partitioned dataset")
+    parser.add_argument("--seek-index", choices=LEVELS, default="state",
+                        help="seek index level of the sorted files")
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    datasets = args.datasets or sorted(cleaning_engine.DATASET_SPECS)
+    unknown = set(datasets) - set(cleaning_engine.DATASET_SPECS)
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(sorted(unknown))}")
+    started = time.perf_counter()
+    summary = []
+    for name in datasets:
+        print(f"\n========== {name.upper()} ==========")
+        for stage, status, seconds in run_dataset(name, args):
+            summary.append((name, stage, status, seconds))
+
+    print(f"\n🏁 Pipeline finished in {time.perf_counter() - started:.1f}s")
+    for name, stage, status, seconds in summary:
+        took = f"{seconds:.1f}s" if seconds else ""
+        print(f"  {name:<12}{stage:<12}{status:<10}{took:>8}")
+
+
+if __name__ == "__main__":
+    main()
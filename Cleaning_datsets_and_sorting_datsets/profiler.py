@@ -0,0 +1,193 @@
+import contextlib
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# PER-RULE CLEANING PROFILER
+# ==========================================
+# With --profile every stage of every chunk is timed: reading, in-chunk
+# drop_duplicates, row hashing, each cleaning rule (state.strip_title,
+# date.date, ...), the gazetteer pass, the global dedup, the quality sink
+# and the output write.  Each record carries
+#   rows        chunk rows the stage covered
+#   values      values it actually processed (distinct values for rules)
+#   seconds     wall time
+#   alloc_peak  peak bytes allocated above the level at stage start
+#               (--profile-alloc only: tracemalloc slows pandas ~10x, which
+#               would distort the timings)
+#   rss         resident set size of the process when the stage ended
+# Worker processes ship their records back with the chunk result.  The run
+# writes <output>.profile.csv (one row per chunk and stage) and
+# <output>.profile.json (per-stage totals + versions) and prints a summary.
+# Stage names containing "." are nested in the stage before the dot.
+
+MIN_SECONDS = 1e-4       # shorter stages get no rows/sec (timer noise)
+
+PROFILE_COLUMNS = ["chunk", "stage", "rows", "values", "seconds", "rows_per_sec",
+                   "alloc_peak_bytes", "rss_bytes", "pid"]
+
+
+def profile_paths(output_file):
+    return output_file + ".profile.csv", output_file + ".profile.json"
+
+
+def rss_bytes():
+    # Current resident set size (Linux); None elsewhere
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Profiler:
+
+    def __init__(self, trace_alloc=False, chunk=0):
+        self.trace_alloc = trace_alloc
+        self.chunk = chunk
+        self.records = []
+        self._open = []          # running peaks of the enclosing stages
+        if trace_alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _fold_peak(self):
+        # reset_peak() is global: hand the peak so far to every open stage first
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._open:
+            frame["peak"] = max(frame["peak"], peak)
+
+    @contextlib.contextmanager
+    def stage(self, name, rows, values=None, chunk=None):
+        frame = None
+        if self.trace_alloc:
+            self._fold_peak()
+            tracemalloc.reset_peak()
+            frame = {"base": tracemalloc.get_traced_memory()[0], "peak": 0}
+            self._open.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if frame is not None:
+                self._fold_peak()
+                self._open.pop()
+            self.records.append({
+                "chunk": self.chunk if chunk is None else chunk,
+                "stage": name,
+                "rows": int(rows),
+                "values": int(rows if values is None else values),
+                "seconds": seconds,
+                "alloc_peak_bytes": max(frame["peak"] - frame["base"], 0) if frame else None,
+                "rss_bytes": rss_bytes(),
+                "pid": os.getpid(),
+            })
+
+    def drain(self):
+        records, self.records = self.records, []
+        return records
+
+    def add(self, records, chunk):
+        # Records made in a worker, which does not know the chunk number
+        for record in records:
+            record["chunk"] = chunk
+        self.records.extend(records)
+
+
+class NullProfiler:
+    # Stand-in when profiling is off
+
+    @staticmethod
+    def stage(name, rows, values=None, chunk=None):
+        return contextlib.nullcontext()
+
+    @staticmethod
+    def drain():
+        return []
+
+
+NULL = NullProfiler()
+
+
+def timed_chunks(chunks, profiler, stage="read"):
+    # Attribute time spent waiting on the reader to a "read" stage
+    chunk_no = 0
+    iterator = iter(chunks)
+    while True:
+        chunk_no += 1
+        with profiler.stage(stage, 0, chunk=chunk_no):
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        profiler.records[-1]["rows"] = profiler.records[-1]["values"] = len(chunk)
+        yield chunk
+
+# ==========================================
+# REPORT
+# ==========================================
+
+
+def summarize(records, wall_seconds):
+    table = pd.DataFrame(records, columns=PROFILE_COLUMNS)
+    grouped = table.groupby("stage", sort=False)
+    summary = pd.DataFrame({
+        "chunks": grouped["chunk"].nunique(),
+        "rows": grouped["rows"].sum(),
+        "values": grouped["values"].sum(),
+        "seconds": grouped["seconds"].sum(),
+        "max_alloc_peak_bytes": grouped["alloc_peak_bytes"].max(),
+        "max_rss_bytes": grouped["rss_bytes"].max(),
+    })
+    summary["rows_per_sec"] = summary["rows"] / summary["seconds"].where(summary["seconds"] >= MIN_SECONDS)
+    # Share of all top-level stage time (worker time counts, so it can exceed wall time)
+    top_level = ~summary.index.str.contains(".", regex=False)
+    summary["share"] = summary["seconds"] / summary.loc[top_level, "seconds"].sum()
+    summary.attrs["wall_seconds"] = wall_seconds
+    return summary.sort_values("seconds", ascending=False)
+
+
+def _json_value(value):
+    if pd.isna(value):
+        return None
+    return round(float(value), 6) if isinstance(value, float) else int(value)
+
+
+def write_report(records, output_file, wall_seconds, meta):
+    table_path, summary_path = profile_paths(output_file)
+    table = pd.DataFrame(records, columns=PROFILE_COLUMNS)
+    table["rows_per_sec"] = table["rows"] / table["seconds"].where(table["seconds"] >= MIN_SECONDS)
+    table.to_csv(table_path, index=False, float_format="%.6g")
+
+    summary = summarize(records, wall_seconds)
+    report = {
+        **meta,
+        "wall_seconds": round(wall_seconds, 3),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "stages": {
+            stage: {k: _json_value(v) for k, v in row.items()}
+            for stage, row in summary.to_dict(orient="index").items()
+        },
+    }
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return summary, table_path, summary_path
+
+
+def print_summary(summary, limit=15):
+    print(f"\n⏱️  Profile ({summary.attrs['wall_seconds']:.2f}s wall):")
+    print(f"  {'stage':<28}{'seconds':>9}{'share':>8}{'rows/s':>14}{'peak alloc':>12}{'max RSS':>10}")
+    for stage, row in summary.head(limit).iterrows():
+        rate = f"{row['rows_per_sec']:,.0f}" if pd.notna(row["rows_per_sec"]) else "-"
+        peak = row["max_alloc_peak_bytes"]
+        peak = f"{peak / (1 << 20):.1f}MB" if pd.notna(peak) else "-"
+        rss = row["max_rss_bytes"]
+        rss = f"{rss / (1 << 20):.0f}MB" if pd.notna(rss) else "-"
+        print(f"  {stage:<28}{row['seconds']:>9.3f}{row['share']:>8.1%}{rate:>14}{peak:>12}{rss:>10}")
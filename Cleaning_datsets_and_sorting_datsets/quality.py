@@ -0,0 +1,237 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from storage import TableWriter
+
+# ==========================================
+# QUARANTINE SINK & DATA-QUALITY REPORT
+# ==========================================
+# Rules that reject or repair a value (too-short state → INVALID,
+# unparseable date, invalid pincode, gazetteer fill / state or district
+# mismatch) tag the row with a reason code while the chunk is cleaned.
+# The writer then, for the rows that survive de-duplication:
+#   - appends the raw (pre-cleaning) row + reasons + its row number in the
+#     cleaned output to <output>.quarantine.csv, and
+#   - folds per-chunk counters (rows, duplicates, nulls per column, reason
+#     counts, invalid pincodes per state) into <output>.quality.json.
+# Everything is computed on data that is already in memory, so there is no
+# second pass over the output.  Late duplicates removed by a spilled dedup
+# run (see dedup.finalize) are taken back out in finish(): their
+# quarantine rows are dropped, the remaining output_row numbers shifted,
+# and their nulls / reasons / invalid pincodes subtracted from the totals.
+# (Without a quarantine the (reason, output_row) pairs of the run go to a
+# temporary flags file for the same purpose.)  Per-chunk entries stay as
+# the chunks were seen.
+
+REASON_SEPARATOR = ";"
+PINCODE_REASON = "pincode_invalid"
+
+
+def quarantine_path(output_file):
+    # Always CSV: raw values must survive even when they do not fit the schema
+    return output_file + ".quarantine.csv"
+
+
+def report_path(output_file):
+    return output_file + ".quality.json"
+
+
+def flags_path(output_file):
+    # Reasons + output rows only, while a run without quarantine is in progress
+    return output_file + ".flags.tmp.csv"
+
+
+def add_reasons(reasons, flags):
+    # Merge per-row reason labels (object arrays, None = no reason) in place
+    hit = pd.notna(flags)
+    if not hit.any():
+        return
+    both = hit & pd.notna(reasons)
+    reasons[both] = reasons[both] + REASON_SEPARATOR + flags[both]
+    only = hit & ~both
+    reasons[only] = flags[only]
+
+
+def _add_counts(total, counts):
+    for key, n in counts.items():
+        total[key] = total.get(key, 0) + int(n)
+
+
+def _subtract_counts(total, counts, drop_zeros=True):
+    for key, n in counts.items():
+        left = total.get(key, 0) - int(n)
+        if left or not drop_zeros:
+            total[key] = left
+        else:
+            total.pop(key, None)
+
+
+def _reason_counts(reasons):
+    # reason strings ("a;b") → {reason: rows}
+    return (
+        pd.Series(reasons, dtype="string")
+        .str.split(REASON_SEPARATOR).explode().value_counts().to_dict()
+    )
+
+
+def drop_late_rows(path, late_rows, chunk_size=200_000):
+    # Remove the rows of a quarantine / flags CSV whose output_row was
+    # dropped as a late duplicate and renumber the rest; returns the
+    # removed (reason, output_row) rows
+    removed = []
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    header = True
+    # Raw values are copied as text, exactly as they were written
+    for part in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+        out_rows = part["output_row"].astype(np.int64).to_numpy()
+        late = np.isin(out_rows, late_rows)
+        removed.append(pd.DataFrame({"reason": part["reason"][late].to_numpy(),
+                                     "output_row": out_rows[late]}))
+        part = part[~late].copy()
+        part["output_row"] = out_rows[~late] - np.searchsorted(late_rows, out_rows[~late])
+        part.to_csv(tmp_path, mode="a", header=header, index=False)
+        header = False
+    os.replace(tmp_path, path)
+    return pd.concat(removed, ignore_index=True)
+
+
+def _empty_totals():
+    return {
+        "chunks": 0,
+        "rows_in": 0,
+        "duplicates_in_chunk": 0,
+        "duplicates_global": 0,
+        "rows_out": 0,
+        "quarantined_rows": 0,
+        "nulls": {},
+        "reasons": {},
+        "invalid_pincodes_by_state": {},
+    }
+
+
+class QualitySink:
+
+    def __init__(self, output_file, dataset, append=False, quarantine=True):
+        self.dataset = dataset
+        self.output_file = output_file
+        self.report_file = report_path(output_file)
+        self.quarantine_file = quarantine_path(output_file) if quarantine else None
+        if quarantine:
+            self.flags_file = self.quarantine_file
+            self.writer = TableWriter(self.quarantine_file, append=append)
+        else:
+            self.flags_file = flags_path(output_file)
+            self.writer = TableWriter(self.flags_file)
+            if not append and os.path.exists(quarantine_path(output_file)):
+                os.remove(quarantine_path(output_file))
+        self.totals = _empty_totals()
+        self.chunks = []
+
+        # An incremental run extends the previous report
+        if append and os.path.exists(self.report_file):
+            try:
+                with open(self.report_file, "r", encoding="utf-8") as f:
+                    previous = json.load(f)
+                self.totals = {k: v for k, v in previous["totals"].items() if k != "null_rate"}
+                self.chunks = previous["chunks"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def add(self, result, keep, first_row):
+        # result: CleaningPlan output; keep: dedup mask; first_row: rows already written
+        chunk = result["chunk"]
+        reasons = result["reasons"]
+        kept = chunk[keep]
+        kept_reasons = reasons[keep]
+
+        flagged = pd.notna(kept_reasons)
+        reason_counts = {}
+        by_state = {}
+        if flagged.any():
+            reason_counts = _reason_counts(kept_reasons[flagged])
+            if "state" in kept.columns:
+                bad_pin = pd.Series(kept_reasons, dtype="string").str.contains(PINCODE_REASON, na=False)
+                by_state = (
+                    kept["state"][bad_pin.to_numpy()].astype("string").fillna("<NA>")
+                    .value_counts().to_dict()
+                )
+
+        stats = {
+            "chunk": self.totals["chunks"] + 1,
+            "rows_in": int(result["rows_in"]),
+            "duplicates_in_chunk": int(result["rows_in"] - len(chunk)),
+            "duplicates_global": int((~keep).sum()),
+            "rows_out": int(keep.sum()),
+            "quarantined_rows": int(flagged.sum()),
+            "nulls": {col: int(n) for col, n in kept.isna().sum().items()},
+            "reasons": {str(k): int(n) for k, n in reason_counts.items()},
+        }
+        self.chunks.append(stats)
+
+        self.totals["chunks"] += 1
+        for key in ("rows_in", "duplicates_in_chunk", "duplicates_global", "rows_out", "quarantined_rows"):
+            self.totals[key] += stats[key]
+        _add_counts(self.totals["nulls"], stats["nulls"])
+        _add_counts(self.totals["reasons"], stats["reasons"])
+        _add_counts(self.totals["invalid_pincodes_by_state"], by_state)
+
+        # Raw rows of the flagged rows that made it into the output
+        if flagged.any():
+            row_flagged = pd.notna(reasons)
+            kept_flagged = keep[row_flagged]
+            out_rows = first_row + np.cumsum(keep) - 1
+            if self.quarantine_file:
+                rejected = result["flagged_raw"][kept_flagged].copy()
+            else:
+                rejected = pd.DataFrame(index=range(int(kept_flagged.sum())))
+            rejected.insert(0, "reason", reasons[row_flagged][kept_flagged])
+            rejected.insert(1, "output_row", out_rows[row_flagged][kept_flagged])
+            self.writer.write(rejected)
+
+    def _take_back(self, late_rows, late_frame):
+        # Undo what the late duplicates added to the totals and the quarantine
+        _subtract_counts(self.totals["nulls"], late_frame.isna().sum().to_dict(), drop_zeros=False)
+        if not os.path.exists(self.flags_file):
+            return
+        removed = drop_late_rows(self.flags_file, late_rows)
+        self.totals["quarantined_rows"] -= len(removed)
+        if removed.empty:
+            return
+        _subtract_counts(self.totals["reasons"], _reason_counts(removed["reason"]))
+        if "state" in late_frame.columns:
+            bad_pin = removed["reason"].str.contains(PINCODE_REASON).to_numpy()
+            at = np.searchsorted(late_rows, removed["output_row"].to_numpy()[bad_pin])
+            states = late_frame["state"].iloc[at].astype("string").fillna("<NA>")
+            _subtract_counts(self.totals["invalid_pincodes_by_state"], states.value_counts().to_dict())
+
+    def finish(self, late_rows=(), late_frame=None):
+        # late_rows / late_frame: output rows dedup.finalize removed, and their contents
+        self.writer.close()
+        late_rows = np.asarray(late_rows, dtype=np.int64)
+        if len(late_rows):
+            self._take_back(late_rows, late_frame)
+        if not self.quarantine_file and os.path.exists(self.flags_file):
+            os.remove(self.flags_file)
+        self.totals["duplicates_global"] += len(late_rows)
+        self.totals["rows_out"] -= len(late_rows)
+
+        rows = max(self.totals["rows_out"], 1)
+        totals = dict(self.totals)
+        totals["null_rate"] = {col: round(n / rows, 6) for col, n in totals["nulls"].items()}
+        report = {
+            "dataset": self.dataset,
+            "output_file": os.path.abspath(self.output_file),
+            "quarantine_file": os.path.abspath(self.quarantine_file) if self.quarantine_file else None,
+            "totals": totals,
+            "chunks": self.chunks,
+        }
+        tmp_path = self.report_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.report_file)
+        return report
@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import sort_keys
+import spill
+from external_sort import DEFAULT_FAN_IN, ExternalSorter
+
+# ==========================================
+# PARALLEL SAMPLE SORT
+# ==========================================
+# ParallelSorter is ExternalSorter spread over worker processes:
+#   1. add(): the pool sorts and spills each chunk as a run while the main
+#      process cleans the next one.
+#   2. merge(): every run is sampled at evenly spaced rows (runs are sorted
+#      and memory-mapped, so that is a handful of reads); weighted
+#      quantiles of the sampled keys are the bucket splitters.  Each run is
+#      cut at the splitters by binary search, so a bucket is one contiguous
+#      slice of every run.
+#   3. Each bucket merges its slices in its own process (ExternalSorter, so
+#      the same stable order) into a bucket spill file; the buckets are
+#      streamed to emit() in key order as they finish.
+# Buckets cover disjoint key ranges and keep the run order inside, so the
+# output is row for row the single-process sort.
+
+SAMPLES_PER_RUN = 256
+BUCKETS_PER_WORKER = 2       # smaller buckets even out skewed key ranges
+
+
+def _pool(workers):
+    # The sorter scripts run at module level: fork, so workers do not re-run them
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def _sort_run(chunk, sort_cols, path):
+    spill.write_run(sort_keys.sort_frame(chunk, sort_cols), path)
+    return len(chunk)
+
+
+def _merge_bucket(sort_cols, levels, slices, spill_dir, prefix, fan_in, block_rows, path):
+    # Merge (path, start, stop) run slices into one sorted spill at `path`
+    sorter = ExternalSorter(sort_cols, spill_dir, prefix, fan_in=fan_in, block_rows=block_rows)
+    sorter.runs = slices
+    sorter.rows = sum(stop - start for _, start, stop in slices)
+    sorter.set_levels(levels)
+    written = []
+
+    def emit(frame):
+        spill.write_run(frame, path, append=bool(written))
+        written.append(len(frame))
+
+    try:
+        sorter.merge(emit)
+    finally:
+        sorter.cleanup()
+    return sum(written)
+
+
+class ParallelSorter(ExternalSorter):
+
+    def __init__(self, sort_cols, spill_dir, prefix, workers, fan_in=DEFAULT_FAN_IN, block_rows=50_000):
+        super().__init__(sort_cols, spill_dir, prefix, fan_in=fan_in, block_rows=block_rows)
+        self.workers = max(1, workers)
+        self._pool = None
+        self._pending = deque()      # run sorts still in flight
+
+    def add(self, chunk):
+        if len(chunk) == 0:
+            return
+        self._track(chunk)
+        if self._pool is None:
+            self._pool = _pool(self.workers)
+        path = self._spill_path()
+        self._pending.append(self._pool.submit(_sort_run, chunk, self.sort_cols, path))
+        self.runs.append(path)
+        self.rows += len(chunk)
+        # Bound the chunks queued in memory
+        while len(self._pending) >= 2 * self.workers:
+            self._pending.popleft().result()
+
+    # ---------------- SPLITTERS ----------------
+
+    def _sample(self, reader):
+        # Evenly spaced row positions of a run and their (sorted) global keys
+        positions = np.unique(np.linspace(0, reader.rows - 1, min(SAMPLES_PER_RUN, reader.rows)).astype(np.int64))
+        return positions, self.key(reader.take(positions, self.sort_cols))
+
+    def _splitters(self, samples, rows, buckets):
+        # Weighted quantiles: a sample stands for rows / samples rows of its run
+        keys = np.concatenate([keys for _, keys in samples])
+        weights = np.concatenate([np.full(len(keys), n / len(keys)) for (_, keys), n in zip(samples, rows)])
+        order = np.argsort(keys, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        targets = cumulative[-1] * np.arange(1, buckets) / buckets
+        picks = np.minimum(np.searchsorted(cumulative, targets), len(keys) - 1)
+        return np.unique(keys[order][picks])
+
+    def _cuts(self, reader, positions, keys, splitters):
+        # First row of every bucket in this run: the sample brackets each
+        # splitter, and only the rows between two samples are read
+        cuts = [0]
+        for splitter in splitters:
+            i = int(np.searchsorted(keys, splitter, side="left"))
+            lo = 0 if i == 0 else int(positions[i - 1]) + 1
+            hi = int(positions[i]) + 1 if i < len(positions) else reader.rows
+            if hi > lo:
+                bracket = self.key(reader.take(np.arange(lo, hi), self.sort_cols))
+                lo += int(np.searchsorted(bracket, splitter, side="left"))
+            cuts.append(lo)
+        cuts.append(reader.rows)
+        return cuts
+
+    # ---------------- MERGING ----------------
+
+    def merge(self, emit):
+        # Stream all rows, sorted, to emit(frame); returns the row count
+        while self._pending:
+            self._pending.popleft().result()
+        if not self.runs:
+            return 0
+        self.set_levels(self.levels())
+
+        readers = [spill.RunReader(path) for path in self.runs]
+        samples = [self._sample(reader) for reader in readers]
+        splitters = self._splitters(samples, [reader.rows for reader in readers],
+                                    self.workers * BUCKETS_PER_WORKER)
+        cuts = [self._cuts(reader, positions, keys, splitters)
+                for reader, (positions, keys) in zip(readers, samples)]
+        del readers
+
+        if self._pool is None:
+            self._pool = _pool(self.workers)
+        buckets = []
+        for b in range(len(splitters) + 1):
+            slices = [(path, run_cuts[b], run_cuts[b + 1])
+                      for path, run_cuts in zip(self.runs, cuts) if run_cuts[b + 1] > run_cuts[b]]
+            path = self._spill_path()
+            buckets.append((path, self._pool.submit(
+                _merge_bucket, self.sort_cols, self._levels, slices, self.spill_dir,
+                f"{self.prefix}_bucket{b + 1}", self.fan_in, self.block_rows, path)))
+        print(f"🪣 {len(buckets)} buckets merging on {self.workers} workers")
+
+        for path, future in buckets:
+            if future.result():
+                for block in spill.RunReader(path).iter_blocks(self.block_rows):
+                    emit(block.reset_index(drop=True))
+                os.remove(path)
+        self.cleanup()
+        return self.rows
+
+    def cleanup(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        self._pending.clear()
+        super().cleanup()
@@ -0,0 +1,204 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # the pandas C parser is used instead
+    pa = None
+    pa_csv = None
+
+from date_cache import parse_iso_dates
+
+# ==========================================
+# COLUMN DTYPE REGISTRY
+# ==========================================
+# One place that says what every column of the three datasets is, so no
+# reader falls back to inference (int64/float64 counts, object strings,
+# pincodes bouncing between int and str).  Cleaned data:
+#   counts         → int32 (nullable Int32 only while a chunk has blanks)
+#   state/district → category
+#   pincode        → string (6 digits, zero-padded as the cleaners wrote it)
+#   dates          → datetime64 (parsed while reading)
+# Raw exports keep dates, pincodes and counts as text: turning them into
+# values (or rejecting them row by row) is up to the cleaning rules.
+# CSV is read with pyarrow's multithreaded parser when it is installed.
+
+SCHEMA_VERSION = 2
+
+COUNT_DTYPE = "Int32"
+PINCODE_DTYPE = "string"
+CATEGORY = "category"
+DATE = "date"
+
+COUNT_COLUMNS = {
+    "biometric": ("bio_age_5_17", "bio_age_17_"),
+    "demographic": ("demo_age_5_17", "demo_age_17_"),
+    "enrolment": ("age_0_5", "age_5_17", "age_18_greater"),
+}
+
+# Columns every dataset may carry (absent ones are simply ignored)
+COMMON_COLUMNS = {
+    "date": DATE,
+    "enrolment_date": DATE,
+    "state": CATEGORY,
+    "district": CATEGORY,
+    "gender": CATEGORY,
+    "pincode": PINCODE_DTYPE,
+    "geo_check": CATEGORY,
+}
+
+SCHEMAS = {
+    name: {**COMMON_COLUMNS, **{col: COUNT_DTYPE for col in counts}}
+    for name, counts in COUNT_COLUMNS.items()
+}
+
+# Raw exports: dates and counts are cleaned from their text form
+RAW_OVERRIDES = {DATE: CATEGORY, COUNT_DTYPE: "string"}
+
+
+def dataset_of(path):
+    # "…/biometric_cleaned.parquet" → "biometric" (None if not one of ours)
+    name = os.path.basename(str(path)).split("_", 1)[0].lower()
+    return name if name in SCHEMAS else None
+
+
+def column_types(dataset, raw=False):
+    # Registry entry (column → logical type); unknown datasets get the common columns
+    types = dict(SCHEMAS.get(dataset, COMMON_COLUMNS))
+    if raw:
+        types = {col: RAW_OVERRIDES.get(t, t) for col, t in types.items()}
+    return types
+
+
+def pandas_dtypes(dataset, raw=False):
+    # dtype= argument for pd.read_csv (dates are read as text and parsed after)
+    return {
+        col: ("string" if t == DATE else t)
+        for col, t in column_types(dataset, raw).items()
+    }
+
+
+def arrow_type(logical):
+    return {
+        CATEGORY: pa.dictionary(pa.int32(), pa.string()),
+        DATE: pa.date32(),
+        COUNT_DTYPE: pa.int32(),
+        "string": pa.string(),
+    }[logical]
+
+# ==========================================
+# NORMALIZING FRAMES
+# ==========================================
+
+ARROW_TO_PANDAS = {}
+if pa is not None:
+    ARROW_TO_PANDAS = {
+        pa.int32(): pd.Int32Dtype(),
+        pa.uint32(): pd.UInt32Dtype(),
+        pa.int64(): pd.Int64Dtype(),
+    }
+
+
+def compact(frame, dataset=None, raw=False):
+    # Parse text dates, sort categories (code order = string order, as in
+    # categorical.map_unique, so sorting a category column sorts by name) and
+    # store nullable integers without gaps as plain NumPy ints (4 bytes/value,
+    # no mask; plotting libraries expect them)
+    types = column_types(dataset, raw)
+    for col in frame.columns:
+        values = frame[col]
+        if types.get(col) == DATE and not pd.api.types.is_datetime64_any_dtype(values):
+            frame[col] = parse_iso_dates(values)
+        elif isinstance(values.dtype, pd.CategoricalDtype) and not values.cat.categories.is_monotonic_increasing:
+            frame[col] = values.cat.reorder_categories(values.cat.categories.sort_values())
+        elif isinstance(values.dtype, pd.api.extensions.ExtensionDtype) \
+                and pd.api.types.is_integer_dtype(values.dtype) and not values.hasnans:
+            frame[col] = values.to_numpy(dtype=values.dtype.numpy_dtype)
+    return frame
+
+
+def from_arrow(table, dataset=None, raw=False):
+    # Dictionary columns → Categorical, date32 → datetime64, ints keep their width
+    frame = table.to_pandas(date_as_object=False, types_mapper=ARROW_TO_PANDAS.get)
+    return compact(frame, dataset, raw)
+
+# ==========================================
+# CSV READERS
+# ==========================================
+
+
+def _arrow_options(dataset, raw, columns, names):
+    types = {col: arrow_type(t) for col, t in column_types(dataset, raw).items()}
+    read_options = pa_csv.ReadOptions(column_names=names) if names else pa_csv.ReadOptions()
+    convert_options = pa_csv.ConvertOptions(
+        column_types=types,
+        include_columns=list(columns) if columns else None,
+        strings_can_be_null=True,
+    )
+    return read_options, convert_options
+
+
+def read_csv(source, dataset=None, columns=None, raw=False):
+    if pa_csv is not None:
+        read_options, convert_options = _arrow_options(dataset, raw, columns, None)
+        table = pa_csv.read_csv(source, read_options=read_options, convert_options=convert_options)
+        return from_arrow(table, dataset, raw)
+    frame = pd.read_csv(source, usecols=columns, dtype=pandas_dtypes(dataset, raw))
+    return compact(frame, dataset, raw)
+
+
+def _size_of(chunk_size):
+    # chunk_size may be an int or a callable read before every chunk
+    # (memory_budget.ChunkSizer retunes it after the first chunk)
+    return chunk_size if callable(chunk_size) else (lambda: chunk_size)
+
+
+def iter_batches(batches, dataset=None, chunk_size=200_000, raw=False):
+    # Re-batch a stream of Arrow record batches into frames of exactly
+    # chunk_size rows (the last one shorter), index continuing across
+    # chunks like pd.read_csv(chunksize=...)
+    size = _size_of(chunk_size)
+    pending = []
+    pending_rows = 0
+    start = 0
+
+    def emit(table):
+        frame = from_arrow(table, dataset, raw)
+        frame.index = pd.RangeIndex(start, start + len(frame))
+        return frame
+
+    for batch in batches:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= size():
+            rows = size()
+            table = pa.Table.from_batches(pending)
+            yield emit(table.slice(0, rows))
+            start += rows
+            rest = table.slice(rows)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield emit(pa.Table.from_batches(pending))
+
+
+def iter_csv(source, dataset=None, chunk_size=200_000, columns=None, raw=False, names=None):
+    # names: column names when the source has no header line
+    if pa_csv is None:
+        size = _size_of(chunk_size)
+        reader = pd.read_csv(source, iterator=True, usecols=columns,
+                             dtype=pandas_dtypes(dataset, raw),
+                             header=None if names else "infer", names=names)
+        with reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(size())
+                except StopIteration:
+                    return
+                yield compact(chunk, dataset, raw)
+
+    read_options, convert_options = _arrow_options(dataset, raw, columns, names)
+    stream = pa_csv.open_csv(source, read_options=read_options, convert_options=convert_options)
+    yield from iter_batches(stream, dataset, chunk_size, raw)
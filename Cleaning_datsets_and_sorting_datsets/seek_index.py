@@ -0,0 +1,294 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # CSV always works
+    pq = None
+
+import schema
+import sort_keys
+from storage import TableWriter, format_of, is_date_column, read_columns, require_pyarrow
+
+# ==========================================
+# SPARSE SEEK INDEX FOR SORTED FILES
+# ==========================================
+# A sorted file is ordered by (date, state, district), so every key block
+# is one contiguous stretch of rows.  IndexedWriter writes the file and a
+# sidecar <file>.seek.npz with one entry per (date, state) -- or per
+# (date, state, district) -- holding
+#   offset   byte offset of the block's first line (CSV; -1 for Parquet)
+#   row      number of its first data row
+#   rows     rows in the block
+# Keys are stored as codes into sorted levels (missing last, as in
+# sort_keys.py), so they pack into one increasing int64 and a key range is
+# two binary searches.  iter_rows() then seeks to the matching blocks and
+# parses only those bytes (CSV) or row groups (Parquet).
+
+INDEX_SUFFIX = ".seek.npz"
+DEFAULT_KEY_COLUMNS = ("date", "state")
+LEVELS = ("none", "state", "district")     # --seek-index: finest key column
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def key_columns(sort_cols, level):
+    # Sort columns up to and including `level` ([] for "none")
+    if level == "none":
+        return []
+    return list(sort_cols[:list(sort_cols).index(level) + 1])
+
+
+def has_index(path):
+    return os.path.isfile(path) and os.path.isfile(index_path(path))
+
+
+def _same(a, b):
+    return all((pd.isna(x) and pd.isna(y)) or x == y for x, y in zip(a, b))
+
+# ==========================================
+# WRITING
+# ==========================================
+
+
+class IndexedWriter:
+    # TableWriter for sorted blocks (e.g. ExternalSorter.merge output) that
+    # also records where every key block starts
+
+    def __init__(self, path, key_cols=DEFAULT_KEY_COLUMNS):
+        self.path = path
+        self.fmt = format_of(path)
+        self.key_cols = list(key_cols)
+        self._writer = TableWriter(path) if self.fmt == "parquet" else None
+        if self._writer is None and os.path.exists(path):
+            os.remove(path)
+        self._bytes = 0
+        self._row = 0
+        self._keys = []          # key tuple per entry
+        self._offsets = []
+        self._starts = []
+        self._rows = []
+
+    @property
+    def blocks(self):
+        return len(self._rows)
+
+    def _write_csv(self, block):
+        # Same bytes as TableWriter; → byte offset of every data row
+        data = block.to_csv(index=False, header=self._bytes == 0).encode("utf-8")
+        header = 1 if self._bytes == 0 else 0
+        ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord("\n"))
+        if len(ends) == len(block) + header:
+            starts = np.concatenate([[0], ends[:-1] + 1])[header:]
+        else:
+            # Quoted newlines inside values: measure row by row instead
+            lengths = [len(block.iloc[i:i + 1].to_csv(index=False, header=False).encode("utf-8"))
+                       for i in range(len(block))]
+            first = len(data) - sum(lengths)
+            starts = first + np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        with open(self.path, "ab") as f:
+            f.write(data)
+        offsets = self._bytes + starts
+        self._bytes += len(data)
+        return offsets
+
+    def write(self, block):
+        if len(block) == 0:
+            return
+        if self._writer is None:
+            offsets = self._write_csv(block)
+        else:
+            self._writer.write(block)
+            offsets = np.full(len(block), -1, dtype=np.int64)
+
+        # Blocks start where the key changes
+        key, _ = sort_keys.frame_key(block, self.key_cols)
+        starts = np.concatenate([[0], np.flatnonzero(key[1:] != key[:-1]) + 1, [len(block)]])
+        firsts = starts[:-1]
+        values = [block[col].iloc[firsts].tolist() for col in self.key_cols]
+
+        for n, (lo, hi) in enumerate(zip(firsts, starts[1:])):
+            entry = tuple(column[n] for column in values)
+            if n == 0 and self._keys and _same(self._keys[-1], entry):
+                self._rows[-1] += int(hi - lo)      # continues the previous block
+                continue
+            self._keys.append(entry)
+            self._offsets.append(int(offsets[lo]))
+            self._starts.append(self._row + int(lo))
+            self._rows.append(int(hi - lo))
+        self._row += len(block)
+
+    def _key_arrays(self):
+        arrays = {}
+        for i, col in enumerate(self.key_cols):
+            values = pd.Series([key[i] for key in self._keys], dtype=object)
+            present = values.notna().to_numpy()
+            if is_date_column(col):
+                raw = pd.to_datetime(values).to_numpy(dtype="datetime64[D]")
+                levels = np.unique(raw[present])
+                codes = np.searchsorted(levels, raw)
+            else:
+                raw = values.astype(str).to_numpy()
+                levels = np.unique(raw[present].astype(str))
+                codes = np.searchsorted(levels, raw.astype(str))
+            codes[~present] = len(levels)
+            arrays[f"levels_{i}"] = levels
+            arrays[f"codes_{i}"] = codes.astype(np.int32)
+        return arrays
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        elif not os.path.exists(self.path):
+            open(self.path, "wb").close()
+        meta = {
+            "format": self.fmt,
+            "dataset": schema.dataset_of(self.path),
+            "key_columns": self.key_cols,
+            "rows": self._row,
+            "file_bytes": os.path.getsize(self.path),
+        }
+        tmp_path = index_path(self.path) + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            meta=np.array(json.dumps(meta)),
+            offset=np.array(self._offsets, dtype=np.int64),
+            row=np.array(self._starts, dtype=np.int64),
+            rows=np.array(self._rows, dtype=np.int64),
+            **self._key_arrays(),
+        )
+        os.replace(tmp_path, index_path(self.path))
+        return self.blocks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ==========================================
+# LOOKUP
+# ==========================================
+
+
+class SeekIndex:
+
+    def __init__(self, path):
+        self.path = path
+        with np.load(index_path(path)) as data:
+            self.meta = json.loads(str(data["meta"]))
+            self.offset = data["offset"]
+            self.row = data["row"]
+            self.rows = data["rows"]
+            self.key_cols = self.meta["key_columns"]
+            self.levels = [data[f"levels_{i}"] for i in range(len(self.key_cols))]
+            codes = [data[f"codes_{i}"].astype(np.int64) for i in range(len(self.key_cols))]
+        if os.path.getsize(path) != self.meta["file_bytes"]:
+            raise ValueError(f"{index_path(path)} is stale: {path} was rewritten")
+        self.codes = codes
+        self.keys, _ = sort_keys.pack([(c, len(levels)) for c, levels in zip(codes, self.levels)])
+
+    def _code(self, i, value, upper):
+        levels = self.levels[i]
+        if levels.dtype.kind == "M":
+            value = np.datetime64(pd.Timestamp(value), "D")
+        else:
+            value = str(value)
+        if upper:
+            return int(np.searchsorted(levels, value, side="right")) - 1
+        return int(np.searchsorted(levels, value, side="left"))
+
+    def _bound(self, prefix, upper):
+        # Packed key of the smallest (largest) key starting with prefix
+        if not isinstance(prefix, (tuple, list)):
+            prefix = (prefix,)
+        key = 0
+        for i, levels in enumerate(self.levels):
+            if i < len(prefix):
+                code = self._code(i, prefix[i], upper)
+            else:
+                code = len(levels) if upper else 0
+            key = key * (len(levels) + 1) + code
+        return key
+
+    def entries(self, lo=None, hi=None, where=None):
+        # Entry numbers with lo <= key <= hi (key prefixes, inclusive) whose
+        # key columns are in where[col]
+        first = 0 if lo is None else int(np.searchsorted(self.keys, self._bound(lo, False), side="left"))
+        stop = len(self.keys) if hi is None else int(np.searchsorted(self.keys, self._bound(hi, True), side="right"))
+        chosen = np.arange(first, max(first, stop))
+        for col, wanted in (where or {}).items():
+            i = self.key_cols.index(col)
+            levels = self.levels[i]
+            if levels.dtype.kind == "M":
+                wanted = [np.datetime64(pd.Timestamp(v), "D") for v in wanted]
+            codes = np.flatnonzero(np.isin(levels, np.asarray(wanted, dtype=levels.dtype)))
+            chosen = chosen[np.isin(self.codes[i][chosen], codes)]
+        return chosen
+
+    def spans(self, entries, max_rows):
+        # Consecutive entries → (first entry, last entry) spans of about max_rows
+        spans = []
+        for n in entries:
+            if spans and spans[-1][1] == n - 1 and self.rows[spans[-1][0]:n].sum() < max_rows:
+                spans[-1][1] = n
+            else:
+                spans.append([n, n])
+        return spans
+
+    def end_offset(self, n):
+        return int(self.offset[n + 1]) if n + 1 < len(self.offset) else self.meta["file_bytes"]
+
+# ==========================================
+# READING
+# ==========================================
+
+
+def iter_rows(path, lo=None, hi=None, where=None, columns=None, chunk_rows=200_000):
+    # Stream the rows of the key range [lo, hi] (see SeekIndex.entries) as
+    # frames indexed by their row number in the file
+    index = SeekIndex(path)
+    dataset = index.meta["dataset"]
+    spans = index.spans(index.entries(lo, hi, where), chunk_rows)
+    if not spans:
+        return
+
+    if index.meta["format"] == "parquet":
+        require_pyarrow()
+        parquet_file = pq.ParquetFile(path)
+        group_rows = [parquet_file.metadata.row_group(i).num_rows
+                      for i in range(parquet_file.num_row_groups)]
+        group_starts = np.concatenate([[0], np.cumsum(group_rows)])
+        for first, last in spans:
+            start = int(index.row[first])
+            stop = int(index.row[last] + index.rows[last])
+            g0 = int(np.searchsorted(group_starts, start, side="right")) - 1
+            g1 = int(np.searchsorted(group_starts, stop, side="left"))
+            table = parquet_file.read_row_groups(list(range(g0, g1)), columns=columns)
+            frame = schema.from_arrow(table.slice(start - group_starts[g0], stop - start), dataset)
+            frame.index = pd.RangeIndex(start, stop)
+            yield frame
+        return
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        for first, last in spans:
+            start = int(index.offset[first])
+            f.seek(start)
+            data = f.read(index.end_offset(last) - start)
+            frame = schema.read_csv(io.BytesIO(header + data), dataset, columns=columns)
+            frame.index = pd.RangeIndex(int(index.row[first]), int(index.row[first]) + len(frame))
+            yield frame
+
+
+def read_rows(path, lo=None, hi=None, where=None, columns=None):
+    frames = list(iter_rows(path, lo, hi, where, columns))
+    if not frames:
+        return pd.DataFrame(columns=columns or read_columns(path))
+    return pd.concat(frames)
@@ -0,0 +1,343 @@
+import argparse
+import os
+import re
+
+from canonical import load_default
+from categorical import map_unique
+from date_cache import parse_iso_dates
+from external_sort import DEFAULT_FAN_IN, ExternalSorter, merge_block_rows
+from memory_budget import SAMPLE_ROWS, ChunkSizer, check_budget, format_size, frame_bytes, parse_size, plan_serial
+from partitions import PartitionedWriter
+from sample_sort import ParallelSorter
+from seek_index import LEVELS, IndexedWriter, index_path, key_columns
+from storage import FORMATS, TableWriter, iter_chunks, with_format
+
+# ==========================================
+# SHARED SORTING ENGINE
+# ==========================================
+# The three sorters standardize state / district names, parse the date and
+# sort by date → state → district.  Like the cleaning rules, each dataset's
+# standardization is a spec of (column, step, *args) tuples, applied once
+# per distinct value.  SortJob holds one sort in progress: add() takes
+# cleaned chunks, from a file (run_sorting) or straight from the cleaner
+# (pipeline.py), and finish() merges them into the sorted output.
+
+CHUNK_SIZE = 200_000
+
+STATE_CORRECTIONS = {
+    'Andaman & Nicobar Islands': 'Andaman And Nicobar Islands',
+    'Chhatisgarh': 'Chhattisgarh',
+    'Dadra & Nagar Haveli': 'Dadra And Nagar Haveli And Daman And Diu',
+    'Dadra And Nagar Haveli': 'Dadra And Nagar Haveli And Daman And Diu',
+    'Daman & Diu': 'Dadra And Nagar Haveli And Daman And Diu',
+    'Daman And Diu': 'Dadra And Nagar Haveli And Daman And Diu',
+    'Jammu & Kashmir': 'Jammu And Kashmir',
+    'Orissa': 'Odisha',
+    'Pondicherry': 'Puducherry',
+    'Tamilnadu': 'Tamil Nadu',
+    'Uttaranchal': 'Uttarakhand',
+    'West  Bengal': 'West Bengal',
+    'West Bangal': 'West Bengal',
+    'Westbengal': 'West Bengal',
+    'Telengana': 'Telangana'
+}
+
+# The biometric sorter never had the Telangana fix
+BIOMETRIC_STATE_CORRECTIONS = {k: v for k, v in STATE_CORRECTIONS.items() if k != 'Telengana'}
+
+DISTRICT_CORRECTIONS = {
+    'Ahmadabad': 'Ahmedabad',
+    'Ahmadnagar': 'Ahmednagar',
+    'Ahmed Nagar': 'Ahmednagar',
+    'Ahilyanagar': 'Ahmednagar',
+    'Allahabad': 'Prayagraj',
+    '?': 'Unknown'
+}
+
+BAD_NAME_PATTERN = re.compile(
+    r"^\s*(\?|unknown|null|none|nan|test|dummy)\s*$",
+    re.IGNORECASE
+)
+
+BIOMETRIC_SORT_SPEC = {
+    "name": "biometric",
+    "prefix": "_tmp_bio",
+    "rules": [
+        ("state", "replace", BIOMETRIC_STATE_CORRECTIONS),
+        ("state", "strip"),
+        ("district", "replace", DISTRICT_CORRECTIONS),
+        ("district", "strip"),
+    ],
+}
+
+DEMOGRAPHIC_SORT_SPEC = {
+    "name": "demographic",
+    "prefix": "_tmp_demo",
+    "rules": [
+        ("state", "strip"),
+        ("state", "replace", STATE_CORRECTIONS),
+        ("state", "min_length", 3, "INVALID"),
+        ("district", "strip"),
+        ("district", "replace", DISTRICT_CORRECTIONS),
+        ("district", "placeholder", 3, "Unknown"),
+    ],
+}
+
+ENROLMENT_SORT_SPEC = {
+    "name": "enrolment",
+    "prefix": "_tmp_enrolment",
+    "rules": DEMOGRAPHIC_SORT_SPEC["rules"],
+}
+
+SORT_SPECS = {
+    spec["name"]: spec for spec in (BIOMETRIC_SORT_SPEC, DEMOGRAPHIC_SORT_SPEC, ENROLMENT_SORT_SPEC)
+}
+
+# ==========================================
+# STEPS (string Series in → Series out)
+# ==========================================
+
+
+def step_strip(values):
+    return values.str.strip()
+
+
+def step_replace(values, mapping):
+    return values.replace(mapping)
+
+
+def step_min_length(values, min_len, replacement):
+    return values.mask((values.str.len() < min_len).fillna(False), replacement)
+
+
+def step_placeholder(values, min_len, replacement):
+    # Too short, or a placeholder such as "?", "null" or "test"
+    invalid = (
+        (values.str.len() < min_len) |
+        (values.str.match(BAD_NAME_PATTERN, na=False))
+    )
+    return values.mask(invalid.fillna(False), replacement)
+
+
+STEPS = {
+    "strip": step_strip,
+    "replace": step_replace,
+    "min_length": step_min_length,
+    "placeholder": step_placeholder,
+}
+
+
+def column_pipelines(spec):
+    # {column: func over distinct values} with the steps in spec order
+    steps = {}
+    for col, step, *args in spec["rules"]:
+        if step not in STEPS:
+            raise ValueError(f"Unknown sorting step '{step}' in {spec['name']} spec")
+        steps.setdefault(col, []).append((STEPS[step], args))
+
+    def pipeline(column_steps):
+        def run(values):
+            for func, args in column_steps:
+                values = func(values, *args)
+            return values
+        return run
+
+    return {col: pipeline(column_steps) for col, column_steps in steps.items()}
+
+
+def corrections(spec, column):
+    # Correct spellings named by the spec (seed the fuzzy canonicalizer)
+    return [
+        value
+        for col, step, *args in spec["rules"] if col == column and step == "replace"
+        for value in args[0].values()
+    ]
+
+
+def detect_date_column(columns):
+    if "date" in columns:
+        return "date"
+    candidates = [c for c in columns if "date" in c.lower()]
+    return candidates[0] if candidates else None
+
+# ==========================================
+# SORT JOB
+# ==========================================
+
+
+class SortJob:
+
+    def __init__(self, spec, output_file, output_format="csv", fuzzy=False, gazetteer_path=None,
+                 partitioned=False, seek_index="state", fan_in=DEFAULT_FAN_IN, workers=1):
+        self.spec = spec
+        self.output_format = output_format
+        self.output_file = with_format(output_file, output_format)
+        if partitioned:
+            self.output_file = os.path.splitext(self.output_file)[0]
+        self.partitioned = partitioned
+        self.seek_index = seek_index
+        self.fan_in = fan_in
+        self.workers = workers
+        # Spill runs and the canonical cache live next to the output
+        self.base_dir = os.path.dirname(os.path.abspath(self.output_file))
+        self.pipelines = column_pipelines(spec)
+
+        # Spellings the dicts miss are resolved fuzzily (once per distinct value)
+        self.canon = None
+        if fuzzy:
+            self.canon, self.canon_cache, self.known_spellings = load_default(
+                self.base_dir, gazetteer_path, corrections(spec, "state"), corrections(spec, "district")
+            )
+        self.sorter = None
+        self.date_col = None
+        self.sort_cols = None
+        self.chunks = 0
+
+    def _start(self, columns):
+        self.date_col = detect_date_column(columns)
+        print(f"📅 Detected date column: {self.date_col}")
+        # Date → State → District; each chunk is sorted and spilled as a run
+        self.sort_cols = [self.date_col, "state", "district"] if self.date_col else ["state", "district"]
+        if self.workers > 1:
+            self.sorter = ParallelSorter(self.sort_cols, self.base_dir, self.spec["prefix"],
+                                         self.workers, fan_in=self.fan_in)
+        else:
+            self.sorter = ExternalSorter(self.sort_cols, self.base_dir, self.spec["prefix"],
+                                         fan_in=self.fan_in)
+
+    def standardize(self, chunk):
+        # Corrections and validation run once per distinct value (~36 states)
+        for col, pipeline in self.pipelines.items():
+            if col in chunk.columns:
+                chunk[col] = map_unique(chunk[col], pipeline)
+
+        if self.canon is not None and "state" in chunk.columns:
+            chunk["state"] = self.canon.map_states(chunk["state"])
+            if "district" in chunk.columns and self.canon.matches_districts:
+                chunk["district"] = self.canon.map_districts(chunk["state"], chunk["district"])
+
+        # Cleaners already wrote YYYY-MM-DD: parse each distinct value once,
+        # without dayfirst guessing (which swaps day/month on ISO strings)
+        if self.date_col and self.date_col in chunk.columns:
+            chunk[self.date_col] = parse_iso_dates(chunk[self.date_col])
+        return chunk
+
+    def add(self, chunk):
+        if self.sorter is None:
+            self._start(list(chunk.columns))
+        self.chunks += 1
+        self.sorter.add(self.standardize(chunk))
+
+    @property
+    def rows(self):
+        return self.sorter.rows if self.sorter is not None else 0
+
+    def finish(self, chunk_rows=CHUNK_SIZE):
+        # Merge the runs into the output; returns the row count
+        if self.sorter is None:
+            self._start([])
+        print(f"\n✅ Finished processing {self.chunks} chunks ({len(self.sorter.runs)} sorted runs)")
+        if self.canon is not None:
+            self.canon.save_cache(self.canon_cache)
+            print(f"🔤 Canonicalized {self.canon.resolved} new spellings ({self.known_spellings} cached)")
+
+        print("📊 Merging sorted runs (Date → State → District)...")
+        self.sorter.block_rows = merge_block_rows(chunk_rows, self.fan_in)
+        try:
+            if self.partitioned:
+                partition_cols = [self.date_col, "state"] if self.date_col else ["state"]
+                with PartitionedWriter(self.output_file, self.spec["name"], partition_cols,
+                                       fmt=self.output_format) as writer:
+                    total_rows = self.sorter.merge(writer.write)
+                print(f"🗂️  {len(writer.partitions):,} partitions")
+            elif self.seek_index != "none":
+                with IndexedWriter(self.output_file, key_columns(self.sort_cols, self.seek_index)) as writer:
+                    total_rows = self.sorter.merge(writer.write)
+                print(f"🔎 Seek index: {writer.blocks:,} blocks → {index_path(self.output_file)}")
+            else:
+                with TableWriter(self.output_file) as writer:
+                    total_rows = self.sorter.merge(writer.write)
+        finally:
+            self.sorter.cleanup()
+
+        print("✅ SUCCESS")
+        print(f"📁 Output saved as: {self.output_file}")
+        print(f"📈 Total rows: {total_rows:,}")
+        return total_rows
+
+    def abort(self):
+        if self.sorter is not None:
+            self.sorter.cleanup()
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+
+def run_sorting(spec, input_file, output_file, max_memory=None, **options):
+    # input_file: cleaned CSV or Parquet; options: see SortJob
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"❌ {spec['name']}_cleaned.csv / .parquet not found")
+    if max_memory:
+        check_budget(max_memory)
+    print(f"📥 Reading {spec['name']} data...")
+
+    job = SortJob(spec, output_file, **options)
+    # With a memory budget the first chunk is a small sample that sizes the rest
+    chunk_size = ChunkSizer(SAMPLE_ROWS) if max_memory else CHUNK_SIZE
+    try:
+        for chunk in iter_chunks(input_file, chunk_size):
+            print(f"🔄 Processing chunk {job.chunks + 1}", end="\r")
+            raw_bytes = frame_bytes(chunk) if job.chunks == 0 and max_memory else 0
+            job.add(chunk)
+            if raw_bytes:
+                chunk_size.rows = plan_serial(max_memory, len(chunk), raw_bytes, frame_bytes(chunk))
+                print(f"📏 Memory budget {format_size(max_memory)} → {chunk_size.rows:,} rows/chunk")
+    except BaseException:
+        job.abort()
+        raise
+    return job.finish(chunk_size.rows if max_memory else CHUNK_SIZE)
+
+
+def build_parser(spec):
+    name = spec["name"]
+    parser = argparse.ArgumentParser(description=f"Sort cleaned {name} data by date → state → district")
+    parser.add_argument("--output-format", choices=FORMATS, default="csv",
+                        help="csv (export) or parquet")
+    parser.add_argument("--gazetteer", default=None,
+                        help="gazetteer .npz with canonical districts per state (default: gazetteer.npz if built)")
+    parser.add_argument("--fuzzy", action="store_true",
+                        help="also canonicalize spellings the correction dicts miss (districts "
+                             "only with a gazetteer)")
+    parser.add_argument("--max-memory", type=parse_size, default=None,
+                        help="memory budget for the chunk pass, e.g. 4G (chunk size from a sample)")
+    parser.add_argument("--partitioned", action="store_true",
+                        help=f"write a Hive-style dataset {name}_sorted/date=.../state=.../part-*.<format> "
+                             "with per-partition stats instead of one file")
+    parser.add_argument("--seek-index", choices=LEVELS, default="state",
+                        help=f"sidecar {name}_sorted.<format>.seek.npz locating every (date, state) "
+                             "or (date, state, district) block (ignored with --partitioned)")
+    parser.add_argument("--fan-in", type=int, default=DEFAULT_FAN_IN,
+                        help="sorted runs merged at once; more runs are merged in several passes")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes for the parallel sample sort (runs sorted and key-range "
+                             "buckets merged in parallel; same output as 1)")
+    return parser
+
+
+def sort_options(args):
+    # SortJob keyword arguments from parsed CLI flags
+    return {
+        "output_format": args.output_format,
+        "fuzzy": args.fuzzy,
+        "gazetteer_path": args.gazetteer,
+        "partitioned": args.partitioned,
+        "seek_index": args.seek_index,
+        "fan_in": args.fan_in,
+        "workers": args.workers,
+    }
+
+
+def run_cli(spec, input_file, output_file):
+    args = build_parser(spec).parse_args()
+    return run_sorting(spec, input_file, output_file, max_memory=args.max_memory, **sort_options(args))
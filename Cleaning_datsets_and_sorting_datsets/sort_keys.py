@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# PACKED INTEGER SORT KEYS
+# ==========================================
+# Sorting on (date, state, district) compares a datetime and two strings
+# per row pair.  All three are low-cardinality, so each column is turned
+# into small integer codes in sort order (day number; rank of the name --
+# categorical codes are already that, as categories are kept sorted) and
+# the codes are packed into one int64 with mixed radix, missing values
+# last.  The permutation then comes from an LSD radix sort: one stable
+# pass per 16-bit digit of the key (NumPy sorts 16-bit integers with an
+# O(n) radix sort), so a typical 26-bit key needs two linear passes.
+
+DIGIT_BITS = 16
+DIGIT_MASK = (1 << DIGIT_BITS) - 1
+MAX_KEY = 2 ** 63
+
+
+def column_codes(values):
+    # → (codes, size): codes in 0..size, where size stands for missing
+    if pd.api.types.is_datetime64_any_dtype(values):
+        days = values.to_numpy(dtype="datetime64[D]")
+        missing = np.isnat(days)
+        days = days.astype(np.int64)
+        if missing.all():
+            return np.zeros(len(values), dtype=np.int64), 0
+        low = days[~missing].min()
+        size = int(days[~missing].max() - low) + 1
+        codes = days - low
+    elif isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        size = len(categories)
+        missing = codes < 0
+        if not categories.is_monotonic_increasing:
+            rank = np.empty(size, dtype=np.int64)
+            rank[categories.argsort()] = np.arange(size)
+            codes = rank[codes]
+    else:
+        codes, uniques = pd.factorize(values, sort=True)
+        codes = codes.astype(np.int64)
+        size = len(uniques)
+        missing = codes < 0
+    codes[missing] = size
+    return codes, size
+
+
+def pack(codes_and_sizes):
+    # Mixed-radix packing, first column most significant → (key, key_range)
+    key = np.zeros(len(codes_and_sizes[0][0]), dtype=np.int64)
+    key_range = 1
+    for codes, size in codes_and_sizes:
+        key_range *= size + 1
+        if key_range >= MAX_KEY:
+            raise ValueError("Too many distinct sort values to pack into a 64-bit key")
+        key = key * (size + 1) + codes
+    return key, key_range
+
+
+def frame_key(frame, columns):
+    return pack([column_codes(frame[col]) for col in columns])
+
+
+def radix_argsort(key, key_range=None):
+    # Stable permutation sorting a non-negative int64 key
+    if key_range is None:
+        key_range = int(key.max()) + 1 if len(key) else 1
+    order = None
+    shift = 0
+    while True:
+        digit = ((key >> shift) & DIGIT_MASK).astype(np.uint16)
+        if order is None:
+            order = np.argsort(digit, kind="stable")
+        else:
+            order = order[np.argsort(digit[order], kind="stable")]
+        shift += DIGIT_BITS
+        if (key_range - 1) >> shift == 0:
+            return order
+
+
+def sort_frame(frame, columns):
+    # Same row order as frame.sort_values(columns, kind="mergesort")
+    key, key_range = frame_key(frame, columns)
+    return frame.take(radix_argsort(key, key_range))
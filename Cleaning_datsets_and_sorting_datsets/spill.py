@@ -0,0 +1,175 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# BINARY SPILL FILES (MEMORY-MAPPED)
+# ==========================================
+# Sorted runs used to be written as CSV and parsed back, dates included.
+# A spill file holds the raw NumPy columns instead, behind a small JSON
+# header, so a run is written once and read back as memory maps:
+#   category / text  → integer codes + the category list in the header
+#   datetime64       → int64 ticks (unit kept in the dtype name, NaT kept)
+#   nullable ints    → values + a bool mask
+#   NumPy numbers    → as they are
+# Reading a block is slicing the maps: nothing is parsed, and only the
+# pages that are touched are read from disk.  No extra dependency.
+#
+# A file is a sequence of segments (one per write_run call, so merge
+# passes can append block by block):
+#   MAGIC | uint64 header length | JSON header | columns at 64-byte
+#   aligned file offsets; the next segment starts where the data ends.
+
+MAGIC = b"SPILL01\n"
+ALIGN = 64
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _encode(values):
+    # Series → (column meta, [arrays to store])
+    meta = {"name": values.name, "dtype": str(values.dtype)}
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        meta["kind"] = "category"
+        meta["categories"] = values.cat.categories.tolist()
+        return meta, [values.cat.codes.to_numpy()]
+    if pd.api.types.is_datetime64_any_dtype(dtype) and not isinstance(dtype, pd.DatetimeTZDtype):
+        meta["kind"] = "datetime"
+        return meta, [values.to_numpy().view(np.int64)]
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in "iufb":
+        meta["kind"] = "masked"
+        mask = values.isna().to_numpy()
+        data = values.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.numpy_dtype.type(0))
+        return meta, [data, mask]
+    if isinstance(dtype, np.dtype) and dtype.kind in "iufb":
+        meta["kind"] = "numpy"
+        return meta, [values.to_numpy()]
+    # Text and anything else: dictionary-encode, restore the dtype on read
+    meta["kind"] = "text"
+    codes, uniques = pd.factorize(values)
+    meta["categories"] = [str(u) for u in uniques]
+    return meta, [codes.astype(np.int32)]
+
+
+def write_run(frame, path, append=False):
+    # Write frame as one segment (append=True adds it to an existing file)
+    columns = []
+    arrays = []
+    extent = 0
+    for col in frame.columns:
+        meta, parts = _encode(frame[col])
+        meta["buffers"] = []
+        for array in parts:
+            array = np.ascontiguousarray(array)
+            offset = _aligned(extent)
+            meta["buffers"].append({"dtype": array.dtype.str, "offset": offset})
+            arrays.append((offset, array))
+            extent = offset + array.nbytes
+        columns.append(meta)
+
+    header = json.dumps({"rows": len(frame), "data_bytes": extent, "columns": columns},
+                        ensure_ascii=False).encode("utf-8")
+    with open(path, "ab" if append else "wb") as f:
+        base = f.tell()
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        data_start = _aligned(f.tell())
+        for offset, array in arrays:
+            f.write(b"\0" * (data_start + offset - f.tell()))
+            array.tofile(f)
+        f.write(b"\0" * (data_start + extent - f.tell()))
+    return data_start + extent - base
+
+
+def _decode(meta, parts, index):
+    # index: a slice or an array of row positions within the segment
+    kind = meta["kind"]
+    if kind == "category":
+        return pd.Categorical.from_codes(parts[0][index], categories=meta["categories"],
+                                         validate=False)
+    if kind == "datetime":
+        return parts[0][index].view(meta["dtype"])
+    if kind == "masked":
+        array_type = pd.api.types.pandas_dtype(meta["dtype"]).construct_array_type()
+        return array_type(np.asarray(parts[0][index]), np.asarray(parts[1][index]))
+    if kind == "numpy":
+        return parts[0][index]
+    # Text: code -1 (missing) picks the trailing None; a Series keeps object
+    # columns object (a bare object array would be inferred as str)
+    categories = np.asarray(meta["categories"] + [None], dtype=object)
+    return pd.Series(categories[parts[0][index]], dtype=meta["dtype"], copy=False)
+
+
+class RunReader:
+    # Memory-mapped segments of one spill file
+
+    def __init__(self, path):
+        self.path = path
+        self.segments = []
+        size = os.path.getsize(path)
+        base = 0
+        with open(path, "rb") as f:
+            while base < size:
+                f.seek(base)
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"Not a spill file: {path}")
+                (header_len,) = struct.unpack("<Q", f.read(8))
+                header = json.loads(f.read(header_len).decode("utf-8"))
+                data_start = _aligned(f.tell())
+                self.segments.append((header, self._map(header, data_start)))
+                base = data_start + header["data_bytes"]
+        self.rows = sum(header["rows"] for header, _ in self.segments)
+
+    def _map(self, header, data_start):
+        rows = header["rows"]
+        return [
+            [np.memmap(self.path, dtype=np.dtype(buf["dtype"]), mode="r",
+                       offset=data_start + buf["offset"], shape=(rows,))
+             if rows else np.empty(0, dtype=np.dtype(buf["dtype"]))
+             for buf in meta["buffers"]]
+            for meta in header["columns"]
+        ]
+
+    @staticmethod
+    def _frame(header, maps, index, columns):
+        return pd.DataFrame({
+            meta["name"]: _decode(meta, parts, index)
+            for meta, parts in zip(header["columns"], maps)
+            if columns is None or meta["name"] in columns
+        })
+
+    def iter_blocks(self, block_rows, start=0, stop=None, columns=None):
+        # DataFrames of at most block_rows rows from rows [start, stop)
+        # (blocks never span segments)
+        stop = self.rows if stop is None else stop
+        first_row = 0
+        for header, maps in self.segments:
+            lo = max(start - first_row, 0)
+            hi = min(stop - first_row, header["rows"])
+            for block_start in range(lo, hi, block_rows):
+                block_stop = min(block_start + block_rows, hi)
+                block = self._frame(header, maps, slice(block_start, block_stop), columns)
+                block.index = pd.RangeIndex(first_row + block_start, first_row + block_stop)
+                yield block
+            first_row += header["rows"]
+
+    def take(self, positions, columns=None):
+        # Rows at the given sorted positions, as one frame indexed by position
+        positions = np.asarray(positions, dtype=np.int64)
+        frames = []
+        first_row = 0
+        for header, maps in self.segments:
+            lo, hi = np.searchsorted(positions, [first_row, first_row + header["rows"]])
+            if hi > lo:
+                frame = self._frame(header, maps, positions[lo:hi] - first_row, columns)
+                frame.index = pd.Index(positions[lo:hi])
+                frames.append(frame)
+            first_row += header["rows"]
+        return frames[0] if len(frames) == 1 else pd.concat(frames)
@@ -0,0 +1,273 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet is optional; CSV always works
+    pa = None
+    pq = None
+
+import schema
+
+# ==========================================
+# TABLE STORAGE (CSV / PARQUET)
+# ==========================================
+# Every stage writes through TableWriter and reads through read_table /
+# iter_chunks, so the file format is chosen by extension alone.  Parquet
+# files get one row group per written chunk and the column types of the
+# schema registry (schema.py): dictionary-encoded state/district/gender,
+# int32 counts, text pincodes and a date32 date column.  CSV stays
+# available as an export and is read back with the same registry.
+
+FORMATS = ("csv", "parquet")
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet"}
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet support needs pyarrow (pip install pyarrow)")
+
+
+def format_of(path):
+    return "parquet" if path.lower().endswith(".parquet") else "csv"
+
+
+def with_format(path, fmt):
+    root, _ = os.path.splitext(path)
+    return root + EXTENSIONS[fmt]
+
+
+def resolve_input(path):
+    # Prefer whichever of X.csv / X.parquet was written most recently
+    existing = [with_format(path, fmt) for fmt in FORMATS if os.path.exists(with_format(path, fmt))]
+    if not existing:
+        return path
+    return max(existing, key=os.path.getmtime)
+
+
+def is_date_column(name):
+    return "date" in name.lower()
+
+# ==========================================
+# ARROW CONVERSION
+# ==========================================
+
+
+def arrow_schema(chunk):
+    require_pyarrow()
+    fields = []
+    for col in chunk.columns:
+        if col in schema.COMMON_COLUMNS:
+            arrow_type = schema.arrow_type(schema.COMMON_COLUMNS[col])
+        elif is_date_column(col):
+            arrow_type = pa.date32()
+        elif pd.api.types.is_numeric_dtype(chunk[col]):
+            arrow_type = pa.int32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(col, arrow_type))
+    return pa.schema(fields)
+
+
+def _dictionary_array(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int32)
+        categories = np.asarray(values.cat.categories, dtype=object)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0),
+            pa.array(categories, type=pa.string()),
+        )
+    strings = values.astype("string").to_numpy(dtype=object, na_value=None)
+    return pa.array(strings, type=pa.string()).dictionary_encode()
+
+
+def _date_array(values):
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values.astype("string"), format="%Y-%m-%d", errors="coerce")
+    return pa.array(values, from_pandas=True).cast(pa.date32())
+
+
+def to_arrow(chunk, table_schema):
+    arrays = []
+    for field in table_schema:
+        values = chunk[field.name]
+        if pa.types.is_dictionary(field.type):
+            arrays.append(_dictionary_array(values))
+        elif pa.types.is_date32(field.type):
+            arrays.append(_date_array(values))
+        elif pa.types.is_string(field.type):
+            strings = values.astype("string").to_numpy(dtype=object, na_value=None)
+            arrays.append(pa.array(strings, type=pa.string()))
+        else:
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=table_schema)
+
+# ==========================================
+# WRITING
+# ==========================================
+
+
+class TableWriter:
+    # append=True keeps an existing file: CSV is appended to in place,
+    # Parquet row groups are copied into a new file before the new ones
+    # (Parquet files cannot be extended in place, so an append costs a
+    # read and a write of the whole existing file).
+    # tee: called with every written chunk as read_table would return it
+    # (parsed back from the CSV text / the Arrow table), so a later stage
+    # can consume the output without reading the file again.
+
+    def __init__(self, path, append=False, tee=None):
+        self.path = path
+        self.fmt = format_of(path)
+        self.tee = tee
+        self.dataset = schema.dataset_of(path)
+        self.schema = None
+        self._writer = None
+        self._write_path = path
+        self._append_from = None
+        if self.fmt == "csv":
+            # CSV chunks are appended to the file, so start from scratch unless resuming
+            if not append and os.path.exists(path):
+                os.remove(path)
+        else:
+            require_pyarrow()
+            if append and os.path.exists(path):
+                self._append_from = pq.ParquetFile(path)
+                self.schema = self._append_from.schema_arrow
+                self._write_path = path + ".tmp"
+
+    def _open_parquet(self):
+        self._writer = pq.ParquetWriter(self._write_path, self.schema)
+        if self._append_from is not None:
+            for i in range(self._append_from.num_row_groups):
+                self._writer.write_table(self._append_from.read_row_group(i))
+
+    def write(self, chunk):
+        if self.fmt == "csv":
+            header = not os.path.exists(self.path)
+            if self.tee is None or len(chunk) == 0:
+                chunk.to_csv(self.path, mode="a", header=header, index=False)
+                return
+            text = chunk.to_csv(index=False)
+            with open(self.path, "a", encoding="utf-8", newline="") as f:
+                f.write(text if header else text[text.index("\n") + 1:])
+            self.tee(schema.read_csv(io.BytesIO(text.encode("utf-8")), self.dataset))
+            return
+
+        if self.schema is None:
+            self.schema = arrow_schema(chunk)
+        if len(chunk) == 0:
+            return
+        if self._writer is None:
+            self._open_parquet()
+        # One row group per chunk
+        table = to_arrow(chunk, self.schema)
+        self._writer.write_table(table, row_group_size=len(chunk))
+        if self.tee is not None:
+            self.tee(schema.from_arrow(table, self.dataset))
+
+    def close(self):
+        if self.fmt != "parquet":
+            return
+        if self._writer is None and self.schema is not None:
+            self._open_parquet()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._write_path != self.path:
+            os.replace(self._write_path, self.path)
+            self._write_path = self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_table(df, path):
+    with TableWriter(path) as writer:
+        writer.write(df)
+
+# ==========================================
+# READING
+# ==========================================
+# dataset: schema registry entry; by default taken from the file name
+# ("demographic_cleaned.csv" → "demographic")
+
+
+def read_table(path, columns=None, dataset=None):
+    dataset = dataset or schema.dataset_of(path)
+    if format_of(path) == "parquet":
+        require_pyarrow()
+        return schema.from_arrow(pq.read_table(path, columns=columns), dataset)
+    return schema.read_csv(path, dataset, columns=columns)
+
+
+def iter_chunks(path, chunksize, columns=None, dataset=None):
+    # chunksize: rows per chunk, or a callable (see memory_budget.ChunkSizer)
+    dataset = dataset or schema.dataset_of(path)
+    if format_of(path) == "parquet":
+        require_pyarrow()
+        parquet_file = pq.ParquetFile(path)
+        batch_size = chunksize() if callable(chunksize) else chunksize
+        batches = parquet_file.iter_batches(batch_size=min(batch_size, 65_536), columns=columns)
+        yield from schema.iter_batches(batches, dataset, chunksize)
+        return
+    yield from schema.iter_csv(path, dataset, chunksize, columns=columns)
+
+
+def read_columns(path):
+    if format_of(path) == "parquet":
+        require_pyarrow()
+        return pq.read_schema(path).names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+# ==========================================
+# REWRITING
+# ==========================================
+
+
+def drop_rows(path, rows):
+    # Remove the given 0-based data rows (sorted) in one streaming pass;
+    # returns the removed rows as read_table would return them
+    tmp_path = path + ".tmp"
+    dataset = schema.dataset_of(path)
+
+    if format_of(path) == "parquet":
+        require_pyarrow()
+        parquet_file = pq.ParquetFile(path)
+        offset = 0
+        removed = []
+        with pq.ParquetWriter(tmp_path, parquet_file.schema_arrow) as writer:
+            for i in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(i)
+                lo, hi = np.searchsorted(rows, [offset, offset + table.num_rows])
+                keep = np.ones(table.num_rows, dtype=bool)
+                keep[rows[lo:hi] - offset] = False
+                writer.write_table(table.filter(pa.array(keep)))
+                removed.append(table.filter(pa.array(~keep)))
+                offset += table.num_rows
+        os.replace(tmp_path, path)
+        if not removed:
+            return schema.from_arrow(parquet_file.schema_arrow.empty_table(), dataset)
+        return schema.from_arrow(pa.concat_tables(removed), dataset)
+
+    pos = 0
+    removed = []
+    with open(path, "r", encoding="utf-8", newline="") as src, \
+            open(tmp_path, "w", encoding="utf-8", newline="") as dst:
+        header = src.readline()
+        dst.write(header)
+        for row_no, line in enumerate(src):
+            if pos < len(rows) and rows[pos] == row_no:
+                pos += 1
+                removed.append(line)
+                continue
+            dst.write(line)
+    os.replace(tmp_path, path)
+    return schema.read_csv(io.BytesIO((header + "".join(removed)).encode("utf-8")), dataset)
@@ -0,0 +1,28 @@
+import pandas as pd
+
+import date_cache
+
+
+def _normalize(values):
+    return date_cache.normalize_dates(pd.Series(values, dtype="string")).tolist()
+
+
+def test_iso_datetimes_keep_month_and_day():
+    assert _normalize(["2025-03-05 00:00:00", "2025-03-06T10:30:00", "2025/03/07 08:00"]) == \
+        ["2025-03-05", "2025-03-06", "2025-03-07"]
+
+
+def test_day_first_dates():
+    assert _normalize(["05-03-2025", "06/03/2025", "07-03-2025 12:00:00", "8 March 2025"]) == \
+        ["2025-03-05", "2025-03-06", "2025-03-07", "2025-03-08"]
+
+
+def test_unparseable_dates_are_not_saved(tmp_path):
+    path = str(tmp_path / "dates.json")
+    failed, parsed = _normalize(["not a date", "09-03-2025"])
+    assert pd.isna(failed) and parsed == "2025-03-09"
+    date_cache.save_cache(path)
+    date_cache._cache.clear()
+    date_cache.load_cache(path)
+    assert "09-03-2025" in date_cache._cache
+    assert "not a date" not in date_cache._cache
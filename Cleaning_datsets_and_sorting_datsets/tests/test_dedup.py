@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import schema
+from dedup import RowDeduplicator, hash_rows
+from storage import TableWriter, read_table
+
+CHUNK_ROWS = 500
+
+
+def _rows(n=3000, seed=0):
+    # demographic-shaped rows drawn from few values: many duplicates
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "date": rng.choice(["2025-03-01", "2025-03-02", "2025-03-03"], n),
+        "state": rng.choice(["Delhi", "Goa"], n),
+        "district": rng.choice(["North", "South"], n),
+        "pincode": rng.choice(["110001", "403001"], n),
+        "demo_age_5_17": rng.integers(0, 20, n),
+        "demo_age_17_": rng.integers(0, 5, n),
+    })
+    return schema.read_csv(io.BytesIO(frame.to_csv(index=False).encode("utf-8")), "demographic")
+
+
+def _clean(dedup, frame, path, append=False, first_row=0):
+    # Write the rows keep_mask lets through, as cleaning_engine does → rows written
+    written = first_row
+    with TableWriter(path, append=append) as writer:
+        for start in range(0, len(frame), CHUNK_ROWS):
+            chunk = frame.iloc[start:start + CHUNK_ROWS]
+            keep = dedup.keep_mask(hash_rows(chunk), first_row=written)
+            writer.write(chunk[keep])
+            written += int(keep.sum())
+    return written
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def output_file(request, tmp_path):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    return str(tmp_path / f"demographic_cleaned.{request.param}")
+
+
+def test_spilled_dedup_matches_drop_duplicates(output_file, tmp_path):
+    frame = _rows()
+    dedup = RowDeduplicator(memory_mb=0.001, spill_dir=str(tmp_path), partition_bits=2)
+    written = _clean(dedup, frame, output_file)
+    assert dedup.spilled.any() and dedup.deferred_rows
+
+    late_rows, late_frame = dedup.finalize(output_file)
+    expected = frame.drop_duplicates().reset_index(drop=True)
+    assert len(late_rows) == written - len(expected) > 0
+    assert len(late_frame) == len(late_rows)
+    pd.testing.assert_frame_equal(read_table(output_file), expected)
+    assert not any(p.name.startswith("_tmp_dedup_") for p in tmp_path.iterdir())
+
+
+def test_dedup_state_carries_over_incremental_run(output_file, tmp_path):
+    frame = _rows(seed=1)
+    head, tail = frame.iloc[:2000], frame.iloc[2000:]
+    state_path = str(tmp_path / "dedup.npz")
+
+    first = RowDeduplicator(spill_dir=str(tmp_path))
+    written = _clean(first, head, output_file)
+    assert first.save_state(state_path)
+
+    second = RowDeduplicator(spill_dir=str(tmp_path))
+    second.load_state(state_path)
+    _clean(second, tail, output_file, append=True, first_row=written)
+    assert len(second.finalize(output_file)[0]) == 0
+    pd.testing.assert_frame_equal(read_table(output_file), frame.drop_duplicates().reset_index(drop=True))
+
+
+def test_spilled_state_is_not_saved(tmp_path):
+    dedup = RowDeduplicator(memory_mb=0.001, spill_dir=str(tmp_path), partition_bits=2)
+    dedup.keep_mask(hash_rows(_rows()))
+    assert not dedup.save_state(str(tmp_path / "dedup.npz"))
+    assert not (tmp_path / "dedup.npz").exists()
+    dedup.finalize(str(tmp_path / "unused.csv"))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+import sort_keys
+from external_sort import ExternalSorter
+from sample_sort import ParallelSorter
+
+SORT_COLS = ["date", "state", "district"]
+CHUNK_ROWS = 700
+
+
+def _rows(n=5000, seed=3):
+    # Many ties and missing keys, so stability and NaN placement matter
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.to_datetime("2025-03-01") + pd.to_timedelta(rng.integers(0, 40, n), unit="D"))
+    dates[rng.random(n) < 0.05] = pd.NaT
+    return pd.DataFrame({
+        "date": dates.astype("datetime64[ms]"),
+        "state": pd.Categorical(rng.choice(["Delhi", "Goa", "Unknown", None], n),
+                                categories=["Delhi", "Goa", "Unknown"]),
+        "district": pd.Series(rng.choice(["North", "South", None], n), dtype=object),
+        "row": np.arange(n),
+    })
+
+
+def _sort(sorter, frame):
+    for start in range(0, len(frame), CHUNK_ROWS):
+        sorter.add(frame.iloc[start:start + CHUNK_ROWS])
+    out = []
+    rows = sorter.merge(out.append)
+    result = pd.concat(out, ignore_index=True)
+    assert rows == len(result) == len(frame)
+    return result
+
+
+def _check(result, frame, spill_dir):
+    pd.testing.assert_frame_equal(result, sort_keys.sort_frame(frame, SORT_COLS).reset_index(drop=True))
+    assert (result["row"].to_numpy() == frame.sort_values(SORT_COLS, kind="stable")["row"].to_numpy()).all()
+    assert not list(spill_dir.iterdir())
+
+
+def test_external_sort_matches_in_memory_sort(tmp_path):
+    # 8 runs merged two at a time: two intermediate passes before the last
+    frame = _rows()
+    sorter = ExternalSorter(SORT_COLS, str(tmp_path), "t", fan_in=2, block_rows=200)
+    _check(_sort(sorter, frame), frame, tmp_path)
+
+
+def test_sample_sort_matches_in_memory_sort(tmp_path):
+    # 3 workers → 6 buckets, each merging its run slices two at a time
+    frame = _rows(seed=4)
+    sorter = ParallelSorter(SORT_COLS, str(tmp_path), "t", workers=3, fan_in=2, block_rows=200)
+    _check(_sort(sorter, frame), frame, tmp_path)
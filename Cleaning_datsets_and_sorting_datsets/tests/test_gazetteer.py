@@ -0,0 +1,34 @@
+import pandas as pd
+
+import gazetteer
+
+
+def _gazetteer():
+    return gazetteer.Gazetteer.from_table(
+        [110001, 400001], ["Delhi", "Maharashtra"], ["New Delhi", "Mumbai"])
+
+
+def _chunk(rows):
+    return pd.DataFrame(rows, columns=["pincode", "state", "district"])
+
+
+def test_repair_flags_district_mismatch():
+    chunk = _chunk([
+        ["110001", "Delhi", "New Delhi"],        # agrees
+        ["400001", "Maharashtra", "Pune"],       # right state, wrong district
+        ["400001", "Delhi", "Mumbai"],           # wrong state
+        ["400001", "Maharashtra", "Unknown"],    # missing district is filled
+        ["999999", "Delhi", "Pune"],             # pincode not in the gazetteer
+    ])
+    out = gazetteer.repair(chunk, _gazetteer())
+
+    assert list(out["geo_check"]) == [
+        gazetteer.GEO_OK,
+        gazetteer.GEO_DISTRICT_MISMATCH,
+        gazetteer.GEO_MISMATCH,
+        gazetteer.GEO_FILLED,
+        gazetteer.GEO_UNKNOWN,
+    ]
+    # Mismatches are flagged, not overwritten
+    assert out["district"][1] == "Pune"
+    assert out["district"][3] == "Mumbai"
@@ -0,0 +1,34 @@
+import pytest
+
+import memory_budget
+
+MB = 1 << 20
+
+
+def test_plan_cleaning_rejects_budget_below_process_base():
+    with pytest.raises(ValueError, match="too small"):
+        memory_budget.plan_cleaning(64 * MB, 50_000, 20 * MB, 10 * MB, workers=4,
+                                    reserved_bytes=16 * MB)
+
+
+def test_plan_cleaning_rejects_budget_without_room_for_min_chunk():
+    # Covers the base process, but not MIN_CHUNK_ROWS rows of ~10 KB each
+    with pytest.raises(ValueError, match="too small"):
+        memory_budget.plan_cleaning(210 * MB, 1_000, 5 * MB, 5 * MB, workers=1)
+
+
+def test_plan_cleaning_fits_budget():
+    plan = memory_budget.plan_cleaning(2048 * MB, 50_000, 20 * MB, 10 * MB, workers=4)
+    assert memory_budget.MIN_CHUNK_ROWS <= plan["chunk_rows"] <= memory_budget.MAX_CHUNK_ROWS
+    assert 1 <= plan["workers"] <= 4
+
+
+def test_plan_serial_rejects_infeasible_budget():
+    with pytest.raises(ValueError, match="too small"):
+        memory_budget.plan_serial(64 * MB, 50_000, 20 * MB, 10 * MB)
+
+
+def test_check_budget_counts_reserved_bytes():
+    memory_budget.check_budget(256 * MB)
+    with pytest.raises(ValueError, match="too small"):
+        memory_budget.check_budget(256 * MB, reserved_bytes=64 * MB)
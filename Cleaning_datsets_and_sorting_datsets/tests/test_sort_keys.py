@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+import sort_keys
+
+SORT_COLS = ["date", "state", "district"]
+
+
+def _rows(n=5000, seed=0):
+    # Few distinct keys (many ties) with missing dates, states and districts
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.to_datetime("2025-03-01") + pd.to_timedelta(rng.integers(0, 40, n), unit="D"))
+    dates[rng.random(n) < 0.05] = pd.NaT
+    states = pd.Series(rng.choice(["Goa", "Delhi", "Unknown", "Kerala", None], n))
+    districts = pd.Series(rng.choice(["North", "South", "East", None], n), dtype=object)
+    return pd.DataFrame({
+        "date": dates.astype("datetime64[ms]"),
+        "state": states.astype(pd.CategoricalDtype(sorted(states.dropna().unique()))),
+        "district": districts,
+        "row": np.arange(n),
+    })
+
+
+def test_radix_order_matches_stable_sort_values():
+    frame = _rows()
+    expected = frame.sort_values(SORT_COLS, kind="stable")["row"].to_numpy()
+    assert (sort_keys.sort_frame(frame, SORT_COLS)["row"].to_numpy() == expected).all()
+
+
+def test_unsorted_categories_sort_by_name():
+    frame = _rows(seed=1)
+    frame["state"] = frame["state"].cat.reorder_categories(frame["state"].cat.categories[::-1])
+    expected = frame.assign(state=frame["state"].astype(object)).sort_values(SORT_COLS, kind="stable")
+    assert (sort_keys.sort_frame(frame, SORT_COLS)["row"].to_numpy() == expected["row"].to_numpy()).all()
+
+
+def test_radix_argsort_multi_digit_keys():
+    key = np.random.default_rng(2).integers(0, 2 ** 40, 10_000)
+    order = sort_keys.radix_argsort(key)
+    assert (order == np.argsort(key, kind="stable")).all()
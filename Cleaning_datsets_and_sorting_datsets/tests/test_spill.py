@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+import spill
+
+
+def _frame(n, offset=0):
+    rng = np.random.default_rng(offset)
+    frame = pd.DataFrame({
+        "date": pd.Series(pd.to_datetime("2025-03-01") + pd.to_timedelta(rng.integers(0, 9, n), unit="D"))
+        .astype("datetime64[ms]"),
+        "state": pd.Categorical(rng.choice(["Delhi", "Goa", "Kerala"], n), categories=["Delhi", "Goa", "Kerala"]),
+        "pincode": pd.Series(rng.choice(["110001", "403001"], n), dtype="string"),
+        "district": pd.Series(rng.choice(["North", "South"], n), dtype=object),
+        "count": pd.array(rng.integers(0, 100, n), dtype="Int32"),
+        "ratio": rng.random(n),
+        "row": np.arange(offset, offset + n),
+    })
+    # Missing values of every kind
+    frame.loc[::7, ["date", "state", "pincode", "district", "count"]] = None
+    return frame
+
+
+def test_write_run_round_trips_with_dtypes(tmp_path):
+    path = str(tmp_path / "run.spill")
+    first, second = _frame(500), _frame(300, offset=500)
+    spill.write_run(first, path)
+    spill.write_run(second, path, append=True)
+
+    reader = spill.RunReader(path)
+    assert reader.rows == 800
+    expected = pd.concat([first, second], ignore_index=True)
+    blocks = list(reader.iter_blocks(128))
+    assert max(len(b) for b in blocks) <= 128
+    result = pd.concat(blocks)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_slices_and_take(tmp_path):
+    path = str(tmp_path / "run.spill")
+    frame = _frame(400)
+    spill.write_run(frame.iloc[:250], path)
+    spill.write_run(frame.iloc[250:], path, append=True)
+    reader = spill.RunReader(path)
+
+    part = pd.concat(reader.iter_blocks(100, start=200, stop=300, columns=["count", "row"]))
+    pd.testing.assert_frame_equal(part, frame.loc[200:299, ["count", "row"]])
+    positions = np.array([0, 249, 250, 399])
+    pd.testing.assert_frame_equal(reader.take(positions), frame.iloc[positions])
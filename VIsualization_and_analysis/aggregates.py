@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_loading  # noqa: F401  (puts the pipeline modules on sys.path)
+import schema
+from manifest import QUICK_CHECK_BYTES, file_sha256, hash_range, open_range
+from schema import COUNT_COLUMNS
+from storage import format_of, is_date_column, iter_chunks, read_columns, resolve_input
+from streaming_groupby import CHUNK_ROWS, GroupAccumulator
+
+# ==========================================
+# MATERIALIZED AGGREGATE CUBE
+# ==========================================
+# Every figure of uni/bi/tri_analysis.py is a sum or a row count over date,
+# state or district, or the distribution of one count column.  The cube of
+# a dataset holds exactly that:
+#   cells    one row per (date, state, district): rows + the sum of every
+#            count column and of every per-row total in TOTALS
+#   values   per count column, the rows per (date, state, value) -- the
+#            per-row histograms / KDEs are drawn from these as weights
+# It is built once, streaming *_cleaned.* through streaming_groupby.py,
+# and saved next to it as <file>.cube.npz (keys stored as codes into
+# sorted levels, as in seek_index.py).
+#
+# The cube is kept in step with the cleaned file the way the cleaning
+# manifest follows the raw export: it records how many bytes it has seen
+# and a SHA-256 per byte segment it folded in.  When --incremental
+# cleaning appends the next day's rows, only the new segment is read and
+# its totals are added into the cells; if any earlier segment changed
+# (a full re-clean rewrote history) or the file is Parquet, the cube is
+# rebuilt.  size + mtime skip all checks when nothing happened.
+
+CUBE_SUFFIX = ".cube.npz"
+CUBE_VERSION = 2
+CELL_COLUMNS = ("date", "state", "district")
+VALUE_COLUMNS = ("date", "state")
+
+# Per-row totals of the figures, added up before grouping: a row missing
+# any of its counts has no total, as when the scripts added the columns
+# of the cleaned rows (a sum of column sums would count its other ones)
+TOTALS = {
+    "biometric": {"total_updates": ("bio_age_5_17", "bio_age_17_")},
+    "enrolment": {"total_enrolment": ("age_0_5", "age_5_17", "age_18_greater")},
+}
+
+
+def cube_path(path):
+    return path + CUBE_SUFFIX
+
+# ==========================================
+# KEY CODES
+# ==========================================
+
+
+def _encode(values):
+    # → (codes, sorted levels); missing values get code len(levels)
+    codes, uniques = pd.factorize(values, sort=True)
+    if is_date_column(values.name):
+        levels = np.asarray(uniques, dtype="datetime64[D]")
+    else:
+        levels = np.asarray(uniques.astype(str), dtype=str)
+    codes = codes.astype(np.int32)
+    codes[codes < 0] = len(levels)
+    return codes, levels
+
+
+def _codes_in(values, levels):
+    # Codes of values that all appear in levels (missing → len(levels))
+    present = values.notna().to_numpy()
+    if levels.dtype.kind == "M":
+        raw = values.to_numpy(dtype="datetime64[D]")
+    else:
+        raw = values.astype(object).where(present, "").to_numpy(dtype=str)
+    codes = np.searchsorted(levels, raw).astype(np.int32)
+    codes[~present] = len(levels)
+    return codes
+
+
+def _decode(codes, levels):
+    if levels.dtype.kind == "M":
+        return pd.Series(np.append(levels, np.datetime64("NaT"))[codes]).astype("datetime64[ms]")
+    return pd.Series(pd.Categorical.from_codes(np.where(codes == len(levels), -1, codes), categories=levels))
+
+# ==========================================
+# BUILDING
+# ==========================================
+
+
+def _accumulate(chunks, counts, totals):
+    # Stream chunks into (cells, {count column: values}) frames shaped
+    # like Cube.cells / Cube.values
+    cells = GroupAccumulator(CELL_COLUMNS, counts + list(totals), stats=("sum",))
+    values = {col: GroupAccumulator(VALUE_COLUMNS + ("value",)) for col in counts}
+    for chunk in chunks:
+        # Int64: the total of three int32 counts may not fit int32
+        cells.add(chunk.assign(**{total: sum(chunk[col].astype("Int64") for col in parts)
+                                  for total, parts in totals.items()}))
+        for col, accumulator in values.items():
+            accumulator.add(chunk[list(VALUE_COLUMNS)].assign(value=chunk[col]))
+
+    table = cells.result().rename(columns={f"{col}_sum": col for col in counts + list(totals)})
+    hists = {}
+    for col, accumulator in values.items():
+        hist = accumulator.result().dropna(subset=["value"])
+        hists[col] = hist.assign(value=hist["value"].astype(np.int64))
+    return table, hists
+
+
+def _merge(old, new, keys):
+    # Two cube frames over the same keys → one, measures added up
+    both = pd.concat([old, new], ignore_index=True)
+    return both.groupby(list(keys), observed=True, dropna=False).sum().reset_index()
+
+
+def _arrays(cells, values, counts, totals):
+    # Cube frames → npz arrays
+    arrays = {}
+    for col in CELL_COLUMNS:
+        arrays[f"cell_{col}"], arrays[f"levels_{col}"] = _encode(cells[col])
+    for col in ["rows"] + counts + totals:
+        arrays[f"sum_{col}"] = cells[col].to_numpy(dtype=np.int64)
+    for col in counts:
+        hist = values[col]
+        # [date code, state code, value, rows] per row
+        arrays[f"values_{col}"] = np.column_stack(
+            [_codes_in(hist[key], arrays[f"levels_{key}"]) for key in VALUE_COLUMNS]
+            + [hist["value"], hist["rows"]]
+        ).astype(np.int64)
+    return arrays
+
+
+def build_cube(path, dataset, chunk_rows=CHUNK_ROWS):
+    # → (npz arrays of the cube of one cleaned file, rows); the file is
+    # streamed through GroupAccumulators, one chunk in memory at a time
+    counts = list(COUNT_COLUMNS[dataset])
+    totals = TOTALS.get(dataset, {})
+    chunks = iter_chunks(path, chunk_rows, columns=list(CELL_COLUMNS) + counts, dataset=dataset)
+    cells, values = _accumulate(chunks, counts, totals)
+    return _arrays(cells, values, counts, list(totals)), int(cells["rows"].sum())
+
+
+def update_cube(cube, path, start, end, chunk_rows=CHUNK_ROWS):
+    # Fold the CSV rows in bytes [start, end) into cube → (npz arrays, new rows)
+    counts = list(cube.counts)
+    with open_range(path, start, end) as source:
+        # The segment starts mid-file, without a header line
+        chunks = schema.iter_csv(source, cube.dataset, chunk_rows, columns=list(CELL_COLUMNS) + counts,
+                                 names=read_columns(path))
+        totals = {total: TOTALS[cube.dataset][total] for total in cube.totals}
+        cells, values = _accumulate(chunks, counts, totals)
+    merged = {col: _merge(cube.values[col], values[col], VALUE_COLUMNS + ("value",)) for col in counts}
+    return _arrays(_merge(cube.cells, cells, CELL_COLUMNS), merged, counts, cube.totals), int(cells["rows"].sum())
+
+
+def save_cube(cache, arrays, meta):
+    tmp_path = cache + ".tmp.npz"
+    np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, cache)
+
+
+def _load_arrays(cache):
+    with np.load(cache) as data:
+        return json.loads(str(data["meta"])), {key: data[key] for key in data.files if key != "meta"}
+
+
+def _cached_meta(cache):
+    try:
+        with np.load(cache) as data:
+            meta = json.loads(str(data["meta"]))
+    except (OSError, ValueError, KeyError):
+        return None
+    return meta if meta.get("version") == CUBE_VERSION else None
+
+# ==========================================
+# READING
+# ==========================================
+
+
+class Cube:
+
+    def __init__(self, meta, cells, values):
+        self.meta = meta
+        self.dataset = meta["dataset"]
+        self.counts = meta["counts"]
+        self.totals = meta["totals"]
+        self.cells = cells          # date, state, district, rows, <count columns>, <totals>
+        self.values = values        # {count column: date, state, value, rows}
+
+    @classmethod
+    def from_arrays(cls, meta, arrays):
+        levels = {col: arrays[f"levels_{col}"] for col in CELL_COLUMNS}
+        cells = pd.DataFrame({col: _decode(arrays[f"cell_{col}"], levels[col]) for col in CELL_COLUMNS})
+        for col in ["rows"] + meta["counts"] + meta["totals"]:
+            cells[col] = arrays[f"sum_{col}"]
+        values = {}
+        for col in meta["counts"]:
+            table = arrays[f"values_{col}"]
+            frame = pd.DataFrame({key: _decode(table[:, i], levels[key]) for i, key in enumerate(VALUE_COLUMNS)})
+            frame["value"] = table[:, len(VALUE_COLUMNS)]
+            frame["rows"] = table[:, len(VALUE_COLUMNS) + 1]
+            values[col] = frame
+        return cls(meta, cells, values)
+
+    def filter(self, start=None, end=None, states=None):
+        # The cells and values of the rows in the --start / --end / --state window
+        def keep(frame):
+            mask = pd.Series(True, index=frame.index)
+            if start:
+                mask &= frame["date"] >= start
+            if end:
+                mask &= frame["date"] <= end
+            if states:
+                mask &= frame["state"].isin(states)
+            return frame[mask].reset_index(drop=True)
+
+        return Cube(self.meta, keep(self.cells), {col: keep(frame) for col, frame in self.values.items()})
+
+    def distribution(self, col):
+        # Rows per value of a count column: sns.histplot / kdeplot data with weights='rows'
+        return self.values[col].groupby("value")["rows"].sum().rename_axis(col).reset_index()
+
+
+def row_bandwidth(dist):
+    # bw_method for a weighted KDE of distribution() that matches the
+    # default (Scott) KDE of the rows themselves: gaussian_kde weighs the
+    # variance with n - sum(w²)/n instead of n - 1 and takes the factor
+    # from the effective sample size
+    weights = dist["rows"].to_numpy(dtype=np.float64)
+    n = weights.sum()
+    if n < 2:
+        return "scott"
+    return n ** -0.2 * np.sqrt((n - (weights ** 2).sum() / n) / (n - 1))
+
+
+# ==========================================
+# KEEPING THE CUBE CURRENT
+# ==========================================
+
+
+def _ends_mid_line(path, size):
+    if size == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) != b"\n"
+
+
+def _segment(path, start, end):
+    return {"start": start, "end": end, "sha256": hash_range(path, start, end)}
+
+
+def check_cube(meta, path, size, verify="full"):
+    # Can the cube be kept (size == bytes) or extended (size > bytes)?
+    # Returns (ok, reason)
+    if meta is None:
+        return False, "no cube yet"
+    if meta.get("format") != format_of(path):
+        return False, "format changed"
+    if size < meta["bytes"]:
+        return False, "file shrank"
+    if size > meta["bytes"]:
+        if meta["format"] != "csv":
+            return False, "Parquet files are rewritten, not appended"
+        if meta["ends_mid_line"]:
+            return False, "last line was unterminated and the file changed"
+        if meta["header"] != read_columns(path):
+            return False, "header changed"
+    if verify == "quick":
+        start = max(0, meta["bytes"] - QUICK_CHECK_BYTES)
+        if hash_range(path, start, meta["bytes"]) != meta["tail_sha256"]:
+            return False, "earlier bytes changed"
+    else:
+        for segment in meta["segments"]:
+            if hash_range(path, segment["start"], segment["end"]) != segment["sha256"]:
+                return False, f"earlier bytes changed (segment at {segment['start']:,})"
+    if size == meta["bytes"]:
+        return True, "unchanged"
+    return True, f"{size - meta['bytes']:,} bytes appended"
+
+
+def refresh_cube(name, path, verify="full", rebuild=False):
+    # Bring <path>.cube.npz up to date with the cleaned file → Cube
+    cache = cube_path(path)
+    stat = os.stat(path)
+    meta = _cached_meta(cache)
+    if not rebuild and meta is not None and meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+        return Cube.from_arrays(*_load_arrays(cache))
+
+    size = stat.st_size
+    ok, reason = (False, "rebuild requested") if rebuild else check_cube(meta, path, size, verify)
+    if ok and size == meta["bytes"]:
+        # Touched, same content: only the stamp is new
+        meta, arrays = _load_arrays(cache)
+    elif ok:
+        print(f"🧊 {name} cube: {reason}, folding in the new rows...")
+        arrays, rows = update_cube(Cube.from_arrays(*_load_arrays(cache)), path, meta["bytes"], size)
+        meta["rows"] += rows
+        meta["segments"].append(_segment(path, meta["bytes"], size))
+        print(f"🧊 +{rows:,} rows → {len(arrays['sum_rows']):,} cells")
+    else:
+        print(f"🧊 {name} cube: {reason} → building from {os.path.basename(path)}...")
+        arrays, rows = build_cube(path, name)
+        meta = {"version": CUBE_VERSION, "dataset": name, "counts": list(COUNT_COLUMNS[name]),
+                "totals": list(TOTALS.get(name, {})),
+                "format": format_of(path), "header": read_columns(path), "rows": rows,
+                "segments": [{"start": 0, "end": size, "sha256": file_sha256(path)}]}
+        print(f"🧊 {rows:,} rows → {len(arrays['sum_rows']):,} cells")
+    meta.update(bytes=size, ends_mid_line=_ends_mid_line(path, size),
+                tail_sha256=hash_range(path, max(0, size - QUICK_CHECK_BYTES), size),
+                size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    save_cube(cache, arrays, meta)
+    return Cube.from_arrays(meta, arrays)
+
+
+def load_cube(name, start=None, end=None, states=None, verify="full"):
+    # The cube of <name>_cleaned.* (kept current, see refresh_cube),
+    # restricted to the --start / --end / --state filters
+    cube = refresh_cube(name, resolve_input(f"{name}_cleaned.csv"), verify)
+    if start or end or states:
+        cube = cube.filter(start, end, states)
+    return cube
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or update the aggregate cubes ahead of the analysis runs")
+    parser.add_argument("datasets", nargs="*",
+                        help=f"datasets: {', '.join(COUNT_COLUMNS)} (default: all)")
+    parser.add_argument("--verify", choices=("quick", "full"), default="full",
+                        help="check of the bytes already in the cube: the last 1 MiB, or all of them")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="rebuild from scratch instead of folding in appended rows")
+    args = parser.parse_args()
+    unknown = set(args.datasets) - set(COUNT_COLUMNS)
+    if unknown:
+        parser.error(f"unknown dataset(s): {', '.join(sorted(unknown))}")
+    for dataset in args.datasets or COUNT_COLUMNS:
+        cube = refresh_cube(dataset, resolve_input(f"{dataset}_cleaned.csv"), args.verify, args.rebuild)
+        print(f"✅ {dataset}: {len(cube.cells):,} cells, {cube.meta['rows']:,} rows")
+
+
+if __name__ == "__main__":
+    main()
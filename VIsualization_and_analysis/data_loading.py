@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+
+# The cleaning stage owns the storage formats and the schema; reuse its modules
+PIPELINE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "Cleaning_datsets_and_sorting_datsets",
+)
+if PIPELINE_DIR not in sys.path:
+    sys.path.insert(0, PIPELINE_DIR)
+
+
+def add_filter_args(parser):
+    # --start / --end / --state of the analysis scripts
+    parser.add_argument("--start", help="first date to include (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last date to include (YYYY-MM-DD)")
+    parser.add_argument("--state", action="append", dest="states",
+                        help="only this state (repeatable)")
+    return parser
+
+
+def filters_of(args):
+    # Parsed filter args → load_cube kwargs
+    return {"start": args.start, "end": args.end, "states": args.states}
+
+
+def parse_filters(description):
+    # --start / --end / --state for the analysis scripts → load_cube kwargs
+    parser = add_filter_args(argparse.ArgumentParser(description=description))
+    return filters_of(parser.parse_args())
@@ -0,0 +1,121 @@
+import argparse
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")      # headless: figures go to files, never to a window
+import matplotlib.pyplot as plt  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+from aggregates import load_cube  # noqa: E402
+from data_loading import add_filter_args, filters_of  # noqa: E402
+from parallel_chunks import default_workers  # noqa: E402
+
+# ==========================================
+# HEADLESS BATCH RENDERING
+# ==========================================
+# Draws figures 1-52 of the uni / bi / tri analysis scripts to image files
+# instead of windows.  The cubes are loaded once in the main process and
+# each script's prepare() reduces them to the few state / daily series and
+# value distributions every figure plots; a pool of worker processes then
+# gets one figure each, with only that figure's data, draws it with the
+# script's figure_N() on the Agg backend and saves it in every format.
+
+FORMATS = ("png", "svg", "pdf")
+SCRIPTS = ("uni_analysis", "bi_analysis", "tri_analysis")
+DATASETS = ("biometric", "demographic", "enrolment")
+
+
+def _pool(workers):
+    # fork: workers start with matplotlib and the scripts already imported
+    context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def render(script, number, payload, out_dir, formats, dpi):
+    # One figure → [written paths] (empty if the figure had nothing to draw)
+    sns.set_style("whitegrid")
+    draw = importlib.import_module(script).FIGURES[number]
+    plt.close("all")
+    draw(**payload)
+    if not plt.get_fignums():
+        return []
+    figure = plt.gcf()
+    paths = []
+    for fmt in formats:
+        path = os.path.join(out_dir, f"figure_{number:02d}.{fmt}")
+        figure.savefig(path, format=fmt, dpi=dpi)
+        paths.append(path)
+    plt.close("all")
+    return paths
+
+
+def jobs(filters, numbers):
+    # (script, figure number, payload) of every selected figure
+    cubes = [load_cube(name, **filters) for name in DATASETS]
+    for script in SCRIPTS:
+        module = importlib.import_module(script)
+        wanted = [n for n in module.FIGURES if n in numbers]
+        if not wanted:
+            continue
+        data = module.prepare(*cubes)
+        for number in wanted:
+            yield script, number, data[number]
+
+
+def parse_figures(text):
+    # "1-10,28,43-52" → {1..10, 28, 43..52}
+    numbers = set()
+    for part in text.split(","):
+        lo, _, hi = part.strip().partition("-")
+        numbers.update(range(int(lo), int(hi or lo) + 1))
+    return numbers
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render the analysis figures to image files, in parallel and without a display")
+    parser.add_argument("--out", default="figures",
+                        help="output directory (default: figures)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["png"],
+                        help="file formats to write (default: png)")
+    parser.add_argument("--figures", type=parse_figures, default=set(range(1, 53)),
+                        help="figures to render, e.g. 1-10,28,43-52 (default: all 52)")
+    parser.add_argument("--dpi", type=int, default=100,
+                        help="resolution of the raster formats")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="rendering processes (1 = serial)")
+    add_filter_args(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    os.makedirs(args.out, exist_ok=True)
+    print("📊 Preparing figure data...")
+    tasks = list(jobs(filters_of(args), args.figures))
+    print(f"🎨 Rendering {len(tasks)} figures with {args.workers} worker(s)...")
+
+    options = (args.out, args.formats, args.dpi)
+    if args.workers <= 1:
+        results = ((number, render(script, number, payload, *options)) for script, number, payload in tasks)
+    else:
+        pool = _pool(args.workers)
+        futures = {pool.submit(render, script, number, payload, *options): number
+                   for script, number, payload in tasks}
+        results = ((futures[future], future.result()) for future in as_completed(futures))
+    written = 0
+    try:
+        for number, paths in results:
+            written += len(paths)
+            print(f"  figure {number:>2}: {', '.join(os.path.basename(p) for p in paths) or 'nothing to draw'}")
+    finally:
+        if args.workers > 1:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    print(f"✅ {written} files written to {args.out} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+import data_loading  # noqa: F401  (puts the pipeline modules on sys.path)
+from storage import is_date_column
+
+# ==========================================
+# OUT-OF-CORE GROUP-BY
+# ==========================================
+# GroupAccumulator folds chunks of rows into running per-group totals, so
+# a group-by over a cleaned file never holds more than one chunk of it:
+#   - each key column maps its values to integer codes (a dict of the
+#     values seen so far, grown chunk by chunk);
+#   - the codes of a row pack into one int64; a chunk is reduced to its
+#     groups with one np.unique, and the groups are looked up in the
+#     sorted array of packed keys seen so far (new ones are appended);
+#   - bincount / minimum.at give the chunk's rows and per measure sum,
+#     non-missing count, min and max, added into NumPy accumulators
+#     indexed by group number.
+# Memory is bounded by the number of groups, not the number of rows.
+# aggregates.py streams every cleaned file through these to build its cube.
+
+CHUNK_ROWS = 200_000
+STATS = ("sum", "count", "min", "max")
+
+
+class _Codes:
+    # Value → code of one key column, in order of first appearance
+    # (missing values get a code of their own)
+
+    def __init__(self):
+        self.lookup = {}
+        self.values = []
+
+    def encode(self, column):
+        local, uniques = pd.factorize(column)
+        mapping = np.empty(len(uniques) + 1, dtype=np.int64)
+        for i, value in enumerate(list(uniques) + [None]):
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.values)
+                self.values.append(value)
+            mapping[i] = code
+        return mapping[np.where(local < 0, len(uniques), local)]
+
+    def decode(self, codes, date):
+        values = pd.Series([self.values[c] for c in codes], dtype=object)
+        if date:
+            return pd.to_datetime(values).astype("datetime64[ms]")
+        return values.astype("category")
+
+
+class GroupAccumulator:
+
+    def __init__(self, keys, measures=(), stats=STATS):
+        self.keys = list(keys)
+        self.measures = list(measures)
+        self.stats = [s for s in STATS if s in stats]
+        self._codes = {key: _Codes() for key in self.keys}
+        self._bits = 63 // len(self.keys)       # codes pack into one int64
+        self._known = np.zeros(0, dtype=np.int64)     # packed keys seen, sorted
+        self._numbers = np.zeros(0, dtype=np.int64)   # their group numbers
+        self._integer = {}          # measure → sums are whole numbers
+        self.groups = 0
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.acc = {(m, s): np.zeros(0) for m in self.measures for s in self.stats}
+
+    def _grow(self, groups):
+        if groups <= len(self.rows):
+            return
+        size = max(groups, 2 * len(self.rows), 1024)
+        self.rows = np.concatenate([self.rows, np.zeros(size - len(self.rows), dtype=np.int64)])
+        fill = {"sum": 0.0, "count": 0.0, "min": np.inf, "max": -np.inf}
+        for (m, s), values in self.acc.items():
+            self.acc[m, s] = np.concatenate([values, np.full(size - len(values), fill[s])])
+
+    def _group_numbers(self, chunk):
+        # → (group number of every distinct key in the chunk, index into them per row)
+        packed = np.zeros(len(chunk), dtype=np.int64)
+        for key in self.keys:
+            packed = (packed << self._bits) | self._codes[key].encode(chunk[key])
+            if len(self._codes[key].values) >= 1 << self._bits:
+                raise ValueError(f"{key}: too many distinct values to group by")
+        local, inverse = np.unique(packed, return_inverse=True)
+
+        at = np.minimum(np.searchsorted(self._known, local), max(len(self._known) - 1, 0))
+        found = np.zeros(len(local), dtype=bool)
+        if len(self._known):
+            found = self._known[at] == local
+        numbers = np.empty(len(local), dtype=np.int64)
+        numbers[found] = self._numbers[at[found]]
+        new = local[~found]
+        numbers[~found] = np.arange(self.groups, self.groups + len(new))
+        if len(new):
+            known = np.concatenate([self._known, new])
+            order = np.argsort(known, kind="stable")
+            self._known = known[order]
+            self._numbers = np.concatenate([self._numbers, numbers[~found]])[order]
+            self.groups += len(new)
+        return numbers, inverse.ravel()
+
+    def add(self, chunk):
+        if len(chunk) == 0:
+            return
+        numbers, inverse = self._group_numbers(chunk)
+        self._grow(self.groups)
+        n = len(numbers)
+        self.rows[numbers] += np.bincount(inverse, minlength=n)
+        for m in self.measures:
+            column = chunk[m]
+            self._integer.setdefault(m, pd.api.types.is_integer_dtype(column.dtype))
+            values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            present = ~np.isnan(values)
+            where, values = inverse[present], values[present]
+            if "sum" in self.stats:
+                self.acc[m, "sum"][numbers] += np.bincount(where, weights=values, minlength=n)
+            if "count" in self.stats:
+                self.acc[m, "count"][numbers] += np.bincount(where, minlength=n)
+            if "min" in self.stats:
+                low = np.full(n, np.inf)
+                np.minimum.at(low, where, values)
+                self.acc[m, "min"][numbers] = np.minimum(self.acc[m, "min"][numbers], low)
+            if "max" in self.stats:
+                high = np.full(n, -np.inf)
+                np.maximum.at(high, where, values)
+                self.acc[m, "max"][numbers] = np.maximum(self.acc[m, "max"][numbers], high)
+
+    def result(self):
+        # One row per group, sorted by the keys: <keys>, rows, <measure>_<stat>
+        order = self._numbers
+        mask = (1 << self._bits) - 1
+        frame = pd.DataFrame({
+            key: self._codes[key].decode((self._known >> (self._bits * (len(self.keys) - 1 - i))) & mask,
+                                         is_date_column(key))
+            for i, key in enumerate(self.keys)
+        })
+        frame["rows"] = self.rows[order]
+        for (m, s), values in self.acc.items():
+            values = values[order]
+            if s in ("min", "max"):
+                values = np.where(np.isinf(values), np.nan, values)
+            if s == "count" or (s == "sum" and self._integer.get(m)):
+                values = np.round(values).astype(np.int64)
+            frame[f"{m}_{s}"] = values
+        return frame.sort_values(self.keys, na_position="last", ignore_index=True)
+